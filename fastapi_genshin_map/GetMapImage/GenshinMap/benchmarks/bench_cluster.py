@@ -0,0 +1,71 @@
+"""
+聚类性能对比：`genshinmap.cluster` 与原有的 sklearn KMeans + shapely 实现
+
+以 `tests/points.json` 中的坐标点为中心随机扩充到指定数量后进行测试，
+需先安装 genshinmap::
+
+    pip install -e .
+    python benchmarks/bench_cluster.py [数量]
+"""
+import sys
+import json
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+from genshinmap.models import Point, XYZSPoint
+from genshinmap.cluster import ALGORITHMS, cluster_points
+
+DIR = Path(__file__).parents[1] / "tests"
+
+
+def load_points(count: int):
+    with open(DIR / "points.json", encoding="utf-8") as f:
+        points = [Point.parse_obj(i) for i in json.load(f)["point_list"]]
+    rng = np.random.default_rng(0)
+    centers = np.array([(p.x_pos, p.y_pos) for p in points])
+    xy = centers[rng.integers(len(centers), size=count)]
+    xy += rng.normal(0, 400, size=xy.shape)
+    return [XYZSPoint(x, y, 1, 0) for x, y in xy.tolist()]
+
+
+def legacy_k_means_points(points, length=500, clusters=3):
+    from sklearn.cluster import KMeans
+    from shapely.geometry import Point, Polygon
+
+    pos_array = np.array([p[:2] for p in points])
+    k_means = KMeans(n_clusters=clusters).fit(pos_array)
+    result = []
+    for x, y in k_means.cluster_centers_:
+        path = Polygon(
+            [
+                (max(x - length, 0), max(y - length, 0)),
+                (max(x - length, 0), y + length),
+                (x + length, y + length),
+                (x + length, max(y - length, 0)),
+            ]
+        )
+        result.append([p for p in pos_array if path.contains(Point(p))])
+    return sorted(result, key=len, reverse=True)
+
+
+def main(count: int = 2000, number: int = 5):
+    points = load_points(count)
+    print(f"{count} 个坐标点，每项运行 {number} 次的平均耗时：")
+    try:
+        seconds = timeit.timeit(
+            lambda: legacy_k_means_points(points), number=number
+        )
+        print(f"  sklearn + shapely: {seconds / number * 1000:.1f} ms")
+    except ImportError:
+        print("  sklearn + shapely: 未安装，跳过")
+    for algorithm in ALGORITHMS:
+        seconds = timeit.timeit(
+            lambda: cluster_points(points, algorithm=algorithm), number=number
+        )
+        print(f"  {algorithm}: {seconds / number * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
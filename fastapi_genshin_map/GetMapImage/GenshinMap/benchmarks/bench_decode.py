@@ -0,0 +1,75 @@
+"""
+坐标点解析性能对比：`Point.parse_obj` + `PointStore.from_points` 与
+`genshinmap.decode.decode_points`
+
+将 `tests/points.json` 中的坐标点复制扩充到指定数量后进行测试，需先安装 genshinmap::
+
+    pip install -e .
+    python benchmarks/bench_decode.py [数量]
+"""
+import sys
+import json
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from genshinmap.models import Tree, Point
+from genshinmap.store import PointStore
+from genshinmap.decode import decode_labels, decode_points
+
+DIR = Path(__file__).parents[1] / "tests"
+
+
+def load_point_list(count: int):
+    with open(DIR / "points.json", encoding="utf-8") as f:
+        point_list = json.load(f)["point_list"]
+    return [
+        dict(point_list[i % len(point_list)], id=i, label_id=i % 500)
+        for i in range(count)
+    ]
+
+
+def parse_points(point_list):
+    points = [Point.parse_obj(i) for i in point_list]
+    return points, PointStore.from_points(points)
+
+
+def measure_memory(func, *args) -> float:
+    """返回结果占用的内存（MB）"""
+    tracemalloc.start()
+    result = func(*args)
+    # 结果仍被引用时统计，即结果本身占用的内存
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024 / 1024
+
+
+def main(count: int = 50000, number: int = 3):
+    point_list = load_point_list(count)
+    with open(DIR / "labels.json", encoding="utf-8") as f:
+        tree = json.load(f)["tree"]
+
+    print(f"{count} 个坐标点，每项运行 {number} 次的平均耗时与结果占用内存：")
+    for name, func in (
+        ("Point.parse_obj", parse_points),
+        ("decode_points", decode_points),
+    ):
+        seconds = timeit.timeit(lambda: func(point_list), number=number)
+        memory = measure_memory(func, point_list)
+        print(
+            f"  {name}: {seconds / number * 1000:.1f} ms, {memory:.1f} MB"
+        )
+
+    number *= 100
+    print(f"资源树（{len(tree)} 个分类），每项运行 {number} 次的平均耗时：")
+    for name, func in (
+        ("Tree.parse_obj", lambda: [Tree.parse_obj(i) for i in tree]),
+        ("decode_labels", lambda: decode_labels(tree)),
+    ):
+        seconds = timeit.timeit(func, number=number)
+        print(f"  {name}: {seconds / number * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
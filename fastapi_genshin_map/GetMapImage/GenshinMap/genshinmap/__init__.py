@@ -5,13 +5,16 @@ from .models import Point as Point  # noqa: F401
 from .models import Slice as Slice  # noqa: F401
 from .models import MapInfo as MapInfo  # noqa: F401
 from .models import XYPoint as XYPoint  # noqa: F401
+from .store import PointStore as PointStore  # noqa: F401
 from .utils import make_map as make_map  # noqa: F401
 from .request import get_maps as get_maps  # noqa: F401
 from .exc import StatusError as StatusError  # noqa: F401
 from .request import get_labels as get_labels  # noqa: F401
 from .request import get_points as get_points  # noqa: F401
+from .exc import CircuitOpenError as CircuitOpenError  # noqa: F401
 from .utils import convert_pos as convert_pos  # noqa: F401
 from .utils import get_map_by_pos as get_map_by_pos  # noqa: F401
+from .utils import convert_pos_array as convert_pos_array  # noqa: F401
 from .utils import get_points_by_id as get_points_by_id  # noqa: F401
 
 __all__ = ["utils", "request", "exc", "models", "imgs"]
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+from typing import List, Tuple, Literal, TypeVar, Sequence, NamedTuple
+
+import numpy as np
+
+from .models import XYPoint, XYZSPoint
+
+P = TypeVar("P", XYPoint, XYZSPoint)
+Algorithm = Literal["kmeans", "grid", "dbscan"]
+ALGORITHMS: Tuple[Algorithm, ...] = ("kmeans", "grid", "dbscan")
+
+
+class Cluster(NamedTuple):
+    """集群，与 `k_means_points` 原有的返回值一致，可按下标解包"""
+
+    top_left: XYPoint
+    bottom_right: XYPoint
+    points: list
+
+
+def kmeans_centers(
+    xy: np.ndarray, clusters: int, seed: int = 0, iterations: int = 100
+) -> np.ndarray:
+    """
+    使用固定随机种子的 K-Means（k-means++ 初始化）计算集群中心
+
+    参数：
+        xy: `numpy.ndarray`
+            形状为 (N, 2) 的坐标数组
+
+        clusters: `int`
+            集群数量，超过不同坐标的数量时自动减少
+
+        seed: `int` (default: 0)
+            随机种子，种子相同时结果相同
+
+        iterations: `int` (default: 100)
+            最大迭代次数
+
+    返回：
+        `numpy.ndarray`，形状为 (clusters, 2)
+    """
+    clusters = min(clusters, len(np.unique(xy, axis=0)))
+    if clusters <= 0:
+        return np.empty((0, 2))
+    rng = np.random.default_rng(seed)
+
+    centers = [xy[rng.integers(len(xy))]]
+    distances = ((xy - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, clusters):
+        centers.append(xy[rng.choice(len(xy), p=distances / distances.sum())])
+        distances = np.minimum(
+            distances, ((xy - centers[-1]) ** 2).sum(axis=1)
+        )
+    centers = np.array(centers, dtype=np.float64)
+
+    for _ in range(iterations):
+        labels = (
+            ((xy[:, None, :] - centers[None, :, :]) ** 2)
+            .sum(axis=2)
+            .argmin(axis=1)
+        )
+        counts = np.bincount(labels, minlength=clusters)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, xy)
+        # 空集群保持原有中心
+        new_centers = np.where(
+            counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers
+        )
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    return centers
+
+
+def grid_centers(xy: np.ndarray, clusters: int, length: int) -> np.ndarray:
+    """
+    将地图划分为边长为 `length` 的网格，取坐标点最多的网格内坐标的平均值作为中心
+
+    参数：
+        xy: `numpy.ndarray`
+            形状为 (N, 2) 的坐标数组
+
+        clusters: `int`
+            集群数量
+
+        length: `int`
+            网格边长
+
+    返回：
+        `numpy.ndarray`，形状为 (clusters, 2)
+    """
+    cells = np.floor_divide(xy, length).astype(np.int64)
+    _, inverse, counts = np.unique(
+        cells, axis=0, return_inverse=True, return_counts=True
+    )
+    inverse = inverse.reshape(-1)
+    # 数量相同时按网格顺序，保证结果稳定
+    densest = np.argsort(-counts, kind="stable")[:clusters]
+    return np.array([xy[inverse == cell].mean(axis=0) for cell in densest])
+
+
+class GridIndex:
+    """
+    按边长 `size` 的网格对坐标点分桶，查询不超过 `size` 的半径时只需比较
+    周围 9 个网格内的坐标点，内存与邻近点的数量成正比
+    """
+
+    def __init__(self, xy: np.ndarray, size: float):
+        self.xy = xy
+        cells = np.floor_divide(xy, size).astype(np.int64)
+        # 网格编号从 1 开始，周围网格的编号不会越界
+        cells -= cells.min(axis=0) - 1
+        self.height = cells[:, 1].max() + 2
+        self.keys = cells[:, 0] * self.height + cells[:, 1]
+        self.order = np.argsort(self.keys, kind="stable")
+        self.sorted_keys = self.keys[self.order]
+
+    def pairs(
+        self, index: np.ndarray, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        `index` 中每个坐标点与其半径 `radius` 内（包括自身）的坐标点的下标
+
+        返回：
+            `(rows, cols)`，`rows` 为 `index` 中的下标，`cols` 为邻近点的下标
+        """
+        rows, cols = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = self.keys[index] + dx * self.height + dy
+                starts = np.searchsorted(self.sorted_keys, keys, "left")
+                ends = np.searchsorted(self.sorted_keys, keys, "right")
+                lengths = ends - starts
+                row = np.repeat(index, lengths)
+                offsets = np.arange(len(row)) - np.repeat(
+                    np.cumsum(lengths) - lengths, lengths
+                )
+                col = self.order[np.repeat(starts, lengths) + offsets]
+                distances = ((self.xy[row] - self.xy[col]) ** 2).sum(axis=1)
+                near = distances <= radius**2
+                rows.append(row[near])
+                cols.append(col[near])
+        return np.concatenate(rows), np.concatenate(cols)
+
+
+def dbscan_centers(
+    xy: np.ndarray,
+    clusters: int,
+    radius: float,
+    min_samples: int = 3,
+    chunk: int = 1024,
+) -> np.ndarray:
+    """
+    DBSCAN 式密度聚类：半径 `radius` 内至少有 `min_samples` 个点的为核心点，
+    相连的核心点及其邻近点为一个集群，取最大的几个集群的平均坐标作为中心
+
+    参数：
+        xy: `numpy.ndarray`
+            形状为 (N, 2) 的坐标数组
+
+        clusters: `int`
+            集群数量
+
+        radius: `float`
+            邻域半径
+
+        min_samples: `int` (default: 3)
+            核心点邻域内最少的坐标点数量（包括自身），
+            没有任何核心点时取邻近点最多的点作为核心点
+
+        chunk: `int` (default: 1024)
+            每次查询邻近点的坐标点数量
+
+    返回：
+        `numpy.ndarray`，形状为 (clusters, 2)
+    """
+    # 使用网格索引分块查询邻近点，不生成 N×N 的距离矩阵
+    grid = GridIndex(xy, radius)
+
+    def reach(index: np.ndarray) -> np.ndarray:
+        reached = np.zeros(len(xy), dtype=bool)
+        for i in range(0, len(index), chunk):
+            reached[grid.pairs(index[i : i + chunk], radius)[1]] = True
+        return reached
+
+    counts = np.zeros(len(xy), dtype=np.int64)
+    for i in range(0, len(xy), chunk):
+        rows, _ = grid.pairs(np.arange(i, min(i + chunk, len(xy))), radius)
+        counts += np.bincount(rows, minlength=len(xy))
+    core = counts >= min(min_samples, counts.max())
+
+    labels = np.full(len(xy), -1)
+    groups = []
+    # 从邻近点最多的核心点开始扩展，保证结果稳定
+    for start in np.argsort(-counts, kind="stable"):
+        if not core[start] or labels[start] >= 0:
+            continue
+        label = len(groups)
+        members = np.zeros(len(xy), dtype=bool)
+        frontier = np.array([start])
+        while len(frontier):
+            members[frontier] = True
+            reached = reach(frontier[core[frontier]])
+            frontier = np.flatnonzero(reached & ~members & (labels < 0))
+        labels[members & (labels < 0)] = label
+        groups.append(members)
+    groups.sort(key=lambda members: -members.sum())
+    return np.array(
+        [xy[members].mean(axis=0) for members in groups[:clusters]]
+    ).reshape(-1, 2)
+
+
+def window_masks(
+    x: np.ndarray, y: np.ndarray, centers: np.ndarray, length: float
+) -> np.ndarray:
+    """
+    计算每个坐标点是否在各集群中心周围 `length` 范围内（不含边界）
+
+    返回：
+        `numpy.ndarray`，形状为 (集群数量, N) 的布尔数组
+    """
+    low = np.maximum(centers - length, 0)
+    high = centers + length
+    return (
+        (x[None, :] > low[:, None, 0])
+        & (x[None, :] < high[:, None, 0])
+        & (y[None, :] > low[:, None, 1])
+        & (y[None, :] < high[:, None, 1])
+    )
+
+
+def cluster_indices(
+    x: np.ndarray,
+    y: np.ndarray,
+    length: int = 500,
+    clusters: int = 3,
+    algorithm: Algorithm = "kmeans",
+    seed: int = 0,
+) -> List[np.ndarray]:
+    """
+    对坐标列聚类，返回每个集群内坐标点的下标
+
+    参数：
+        x, y: `numpy.ndarray`
+            坐标列，如 `PointColumns.x` 与 `PointColumns.y`
+
+        length: `int` (default: 500)
+            区域大小，集群为中心周围 `length` 范围内的点，
+            同时也是 grid 的网格边长与 dbscan 的邻域半径
+
+        clusters: `int` (default: 3)
+            集群数量
+
+        algorithm: `"kmeans" | "grid" | "dbscan"` (default: "kmeans")
+            计算集群中心的算法
+
+        seed: `int` (default: 0)
+            kmeans 的随机种子
+
+    返回：
+        `list[numpy.ndarray]`，按集群内点的数量降序排序，不包含空集群
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if not len(x):
+        return []
+    xy = np.column_stack((x, y))
+    if algorithm == "kmeans":
+        centers = kmeans_centers(xy, clusters, seed)
+    elif algorithm == "grid":
+        centers = grid_centers(xy, clusters, length)
+    elif algorithm == "dbscan":
+        centers = dbscan_centers(xy, clusters, length)
+    else:
+        raise ValueError(f"unknown cluster algorithm: {algorithm}")
+
+    indices = [
+        np.flatnonzero(mask) for mask in window_masks(x, y, centers, length)
+    ]
+    indices = [index for index in indices if len(index)]
+    # 数量相同时保持中心的顺序
+    indices.sort(key=lambda index: -len(index))
+    return indices
+
+
+def cluster_points(
+    points: Sequence[P],
+    length: int = 500,
+    clusters: int = 3,
+    algorithm: Algorithm = "kmeans",
+    seed: int = 0,
+) -> List[Cluster]:
+    """
+    对坐标点聚类
+
+    参数：
+        points: `list[XYPoint] | list[XYZSPoint]`
+            坐标列表，建议预先使用 `convert_pos` 进行坐标转换
+
+        其余参数同 `cluster_indices`
+
+    返回：
+        `list[Cluster]`，集群内的点保留原有类型（包括层级与角标），
+        按集群内点的数量降序排序
+    """
+    if not points:
+        return []
+    x = np.array([p[0] for p in points], dtype=np.float64)
+    y = np.array([p[1] for p in points], dtype=np.float64)
+    result = []
+    for index in cluster_indices(x, y, length, clusters, algorithm, seed):
+        result.append(
+            Cluster(
+                XYPoint(x[index].min().item(), y[index].min().item()),
+                XYPoint(x[index].max().item(), y[index].max().item()),
+                [points[i] for i in index.tolist()],
+            )
+        )
+    return result
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple, Sequence, NamedTuple
+
+import numpy as np
+
+from .store import PointStore
+
+# 坐标点字段与对应的列类型，与 `PointStore` 一致
+POINT_COLUMNS: Tuple[Tuple[str, Any], ...] = (
+    ("label_id", np.int64),
+    ("x_pos", np.float64),
+    ("y_pos", np.float64),
+    ("z_level", np.int16),
+    ("icon_sign", np.int16),
+    ("area_id", np.int32),
+    ("ctime", "datetime64[s]"),
+)
+
+
+class LabelRecord(NamedTuple):
+    """
+    资源树节点，只保留绘图需要的字段，属性名与 `Tree`、`Label` 一致
+
+    分类的 `children` 为子资源，子资源的 `children` 为空
+    """
+
+    id: int
+    name: str
+    icon: str
+    parent_id: int
+    depth: int
+    children: Tuple["LabelRecord", ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为与米游社接口相同结构的字典，可再次通过 `decode_labels` 解析"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "icon": self.icon,
+            "parent_id": self.parent_id,
+            "depth": self.depth,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def _column(items: Sequence[Dict[str, Any]], key: str, dtype: Any) -> Any:
+    try:
+        return np.array([item[key] for item in items], dtype=dtype)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"invalid point column {key!r}: {e!r}") from e
+
+
+def decode_points(
+    point_list: Sequence[Dict[str, Any]], origin: Tuple[int, int] = (0, 0)
+) -> PointStore:
+    """
+    将 `get_points` 接口返回的原始 `point_list` 直接解析为列式存储
+
+    不创建 `Point` 对象，每一列整体转换并校验类型
+
+    参数：
+        point_list: `list[dict]`
+            米游社接口返回的原始坐标点列表
+
+        origin: `tuple[int, int]` (default: (0, 0))
+            米游社地图 Origin，可通过 `get_maps` 获取
+
+    返回：
+        `PointStore`
+
+    异常：
+        `ValueError`：缺少字段或字段类型错误
+    """
+    columns = [_column(point_list, key, dtype) for key, dtype in POINT_COLUMNS]
+    return PointStore(*columns, origin=origin)
+
+
+def _decode_label(item: Dict[str, Any]) -> LabelRecord:
+    try:
+        return LabelRecord(
+            int(item["id"]),
+            str(item["name"]),
+            str(item["icon"] or ""),
+            int(item["parent_id"]),
+            int(item["depth"]),
+            tuple(map(_decode_label, item.get("children") or ())),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"invalid label {item.get('id')!r}: {e!r}") from e
+
+
+def decode_labels(tree: Sequence[Dict[str, Any]]) -> List[LabelRecord]:
+    """
+    将 `get_labels` 接口返回的原始 `tree` 解析为 `LabelRecord`
+
+    参数：
+        tree: `list[dict]`
+            米游社接口返回的原始资源树
+
+    返回：
+        `list[LabelRecord]`
+
+    异常：
+        `ValueError`：缺少字段或字段类型错误
+    """
+    return [_decode_label(item) for item in tree]
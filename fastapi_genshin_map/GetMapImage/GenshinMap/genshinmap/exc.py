@@ -11,3 +11,18 @@ class StatusError(ValueError):
 
     def __repr__(self) -> str:
         return f"<StatusError status={self.status}, message={self.message}>"
+
+
+class CircuitOpenError(RuntimeError):
+    """米游社接口熔断中，暂时不发起请求"""
+
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        super().__init__(endpoint, retry_after)
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return (
+            f"miHoYo API {self.endpoint} is unavailable, "
+            f"retry after {self.retry_after:.1f}s"
+        )
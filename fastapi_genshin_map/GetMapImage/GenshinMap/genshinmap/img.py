@@ -1,26 +1,23 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+from typing import List
 
-import numpy as np
-from sklearn.cluster import KMeans
-from shapely.geometry import Point, Polygon
-
-from .models import XYPoint, XYZSPoint
-
-Pos = Tuple[float, float]
-Poses = List[XYPoint]
-Points = List[Point]
+from .models import XYZSPoint
+from .cluster import Cluster, Algorithm, cluster_points
 
 
 def k_means_points(
-    points: List[XYZSPoint], length: int = 500, clusters: int = 3
-) -> List[Tuple[XYZSPoint, XYZSPoint, Poses]]:
+    points: List[XYZSPoint],
+    length: int = 500,
+    clusters: int = 3,
+    algorithm: Algorithm = "kmeans",
+    seed: int = 0,
+) -> List[Cluster]:
     """
     通过 K-Means 获取集群坐标列表
 
     参数：
-        points: `list[XYPoint]`
+        points: `list[XYZSPoint]`
             坐标列表，建议预先使用 `convert_pos` 进行坐标转换
 
         length: `int` (default: 500)
@@ -29,13 +26,19 @@ def k_means_points(
         clusters: `int` (default: 3)
             集群数量
 
+        algorithm: `"kmeans" | "grid" | "dbscan"` (default: "kmeans")
+            计算集群中心的算法，见 `genshinmap.cluster`
+
+        seed: `int` (default: 0)
+            K-Means 的随机种子，种子相同时结果相同
+
     返回：
-        `list[tuple[XYPoint, XYPoint, list[XYPoint]]]`
+        `list[Cluster]`
 
-        tuple 中：
+        Cluster 中：
             第 1 个元素为集群最左上方的点
             第 2 个元素为集群最右下方的点
-            第 3 个元素为集群内所有点
+            第 3 个元素为集群内所有点（保留层级与角标）
 
         list 按照集群内点的数量降序排序
 
@@ -51,35 +54,4 @@ def k_means_points(
                 │                     │
                 +---------------------+
     """
-    pos_array = np.array(points)
-    k_means = KMeans(n_clusters=clusters).fit(pos_array)
-    points_temp: List[Points] = []
-    for k_means_pos in k_means.cluster_centers_:
-        x = (
-            k_means_pos[0] - length if k_means_pos[0] > length else 0,
-            k_means_pos[0] + length,
-        )
-        y = (
-            k_means_pos[1] - length if k_means_pos[1] > length else 0,
-            k_means_pos[1] + length,
-        )
-        path = Polygon(
-            [(x[0], y[0]), (x[0], y[1]), (x[1], y[1]), (x[1], y[0])]
-        )
-
-        points_temp.append(
-            [Point(i) for i in pos_array if path.contains(Point(i))]
-        )
-    return_list = []
-    for i in points_temp:
-        pos_array_ = np.array([p.xy for p in i])
-        return_list.append(
-            (
-                XYPoint(pos_array_[:, 0].min(), pos_array_[:, 1].min()),
-                XYPoint(pos_array_[:, 0].max(), pos_array_[:, 1].max()),
-                list(map(lambda p: XYPoint(p.x, p.y), i)),
-            )
-        )
-    return sorted(
-        return_list, key=lambda pos_tuple: len(pos_tuple[2]), reverse=True
-    )
+    return cluster_points(points, length, clusters, algorithm, seed)
@@ -0,0 +1,10 @@
+import logging
+
+try:
+    # 作为服务的一部分时使用服务的 logger
+    from ...logger import logger
+except ImportError:
+    # 单独安装 genshinmap 时没有上层包
+    logger = logging.getLogger("genshinmap")
+
+__all__ = ["logger"]
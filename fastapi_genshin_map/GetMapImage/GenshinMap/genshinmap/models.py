@@ -85,6 +85,9 @@ class Maps(BaseModel):
 
     @validator("slices", pre=True)
     def slices_to_list(cls, v):
+        # 已经展开的列表（例如 `.dict()` 的结果）直接使用
+        if not v or not isinstance(v[0], list):
+            return v
         urls: List[str] = []
         for i in v:
             urls.extend(j["url"] for j in i)
@@ -120,7 +123,9 @@ class MapInfo(BaseModel):
     def detail_str_to_maps(cls, v):
         if not v:
             return None
-        return Maps.parse_raw(v)
+        if isinstance(v, str):
+            return Maps.parse_raw(v)
+        return v
 
     @validator("detail_v2", pre=True)
     def detail_v2_str_to_maps(cls, v):
@@ -227,10 +232,14 @@ class PageLabel(BaseModel):
 
     @validator("center", pre=True)
     def center_str_to_tuple(cls, v: str) -> Optional[Tuple[float, float]]:
+        if not isinstance(v, str):
+            return v
         if v and (splitted := v.split(",")):
             return tuple(map(float, splitted))  # type: ignore
 
     @validator("zoom", pre=True)
     def zoom_str_to_float(cls, v: str):
+        if isinstance(v, (int, float)):
+            return v
         if v:
             return float(v)
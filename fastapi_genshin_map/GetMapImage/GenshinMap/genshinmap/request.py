@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+import time
+import asyncio
+from typing import Any, Dict, List, Tuple, Optional
 
 from httpx import Response, AsyncClient
-from ...logger import logger
-from .exc import StatusError
+
+from .logger import logger
+from .store import PointStore
+from .transport import transport
+from .retry import policy, get_breaker
+from .exc import StatusError, CircuitOpenError
+from .decode import LabelRecord, decode_labels, decode_points
 from .models import (
     Spot,
     Tree,
@@ -16,29 +23,60 @@ from .models import (
     SpotKinds,
 )
 
-API_CLIENT = AsyncClient(
-    base_url="https://waf-api-takumi.mihoyo.com/common/map_user/ys_obc"
-)
+BASE_URL = "https://waf-api-takumi.mihoyo.com/common/map_user/ys_obc"
 Spots = Dict[int, List[Spot]]
 
 
 async def _request(
-    endpoint: str, client: AsyncClient = API_CLIENT
+    endpoint: str, client: Optional[AsyncClient] = None
 ) -> Dict[str, Any]:
+    url = BASE_URL + endpoint
+    client = client or transport.client(url)
+    breaker = get_breaker(endpoint)
+    breaker.calls += 1
+    deadline = time.monotonic() + policy.deadline
     logger.info(f"[API] 正在访问 {endpoint}")
-    while True:
+    for attempt in range(max(policy.max_attempts, 1)):
+        if not breaker.allow():
+            raise CircuitOpenError(endpoint, breaker.retry_after)
         try:
-            resp = await client.get(endpoint)
+            # 单次请求也不能超出整体的时间预算
+            resp = await asyncio.wait_for(
+                client.get(url), deadline - time.monotonic()
+            )
             resp.raise_for_status()
             data: Dict[str, Any] = resp.json()
-            logger.info(f"[API] {data}")
-            if data["retcode"] != 0:
-                raise StatusError(data["retcode"], data["message"])
-            return data["data"]
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
         except Exception as e:
-            if "Timeout" in str(e):
-                logger.warning(f"[API] {e}")
-                continue
+            timeout = isinstance(e, asyncio.TimeoutError)
+            if not (timeout or policy.is_retryable(e)):
+                # 上游有响应（例如 404），说明接口可用
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            delay = policy.delay(attempt)
+            if (
+                timeout
+                or attempt + 1 >= policy.max_attempts
+                or time.monotonic() + delay > deadline
+            ):
+                logger.warning(f"[API] 访问 {endpoint} 失败: {e!r}")
+                raise
+            logger.warning(
+                f"[API] 访问 {endpoint} 失败，{delay:.2f} 秒后重试: {e!r}"
+            )
+            breaker.retries += 1
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        # 坐标点等数据量很大，不记录完整响应
+        logger.info(f"[API] {endpoint} 返回 {data.get('retcode')}")
+        if data["retcode"] != 0:
+            raise StatusError(data["retcode"], data["message"])
+        return data["data"]
+    raise AssertionError("unreachable")
 
 
 async def get_labels(map_id: MapID) -> List[Tree]:
@@ -56,6 +94,21 @@ async def get_labels(map_id: MapID) -> List[Tree]:
     return [Tree.parse_obj(i) for i in data["tree"]]
 
 
+async def get_label_records(map_id: MapID) -> List[LabelRecord]:
+    """
+    获取米游社资源列表，只解析绘图需要的字段，不创建 `Tree` 对象
+
+    参数：
+        map_id: `MapID`
+            地图 ID
+
+    返回：
+        `list[LabelRecord]`
+    """
+    data = await _request(f"/v2/map/label/tree?map_id={map_id}&app_sn=ys_obc")
+    return decode_labels(data["tree"])
+
+
 async def get_points(map_id: MapID) -> List[Point]:
     """
     获取米游社坐标列表
@@ -71,6 +124,26 @@ async def get_points(map_id: MapID) -> List[Point]:
     return [Point.parse_obj(i) for i in data["point_list"]]
 
 
+async def get_point_store(
+    map_id: MapID, origin: Tuple[int, int] = (0, 0)
+) -> PointStore:
+    """
+    获取米游社坐标列表，直接解析为列式存储，不创建 `Point` 对象
+
+    参数：
+        map_id: `MapID`
+            地图 ID
+
+        origin: `tuple[int, int]` (default: (0, 0))
+            米游社地图 Origin，可通过 `get_maps` 获取
+
+    返回：
+        `PointStore`
+    """
+    data = await _request(f"/v3/map/point/list?map_id={map_id}&app_sn=ys_obc")
+    return decode_points(data["point_list"], origin)
+
+
 async def get_maps(map_id: MapID) -> MapInfo:
     """
     获取米游社地图
@@ -115,8 +188,8 @@ async def get_spot_from_game(
         return data["data"]
 
     # 1. 申请刷新
-    resp = await API_CLIENT.post(
-        "/v1/map/spot_kind/sync_game_spot",
+    resp = await transport.post(
+        f"{BASE_URL}/v1/map/spot_kind/sync_game_spot",
         json={
             "map_id": str(map_id.value),
             "app_sn": "ys_obc",
@@ -127,8 +200,9 @@ async def get_spot_from_game(
     _raise_for_retcode(resp)
 
     # 2. 获取类别
-    resp = await API_CLIENT.get(
-        "/v1/map/spot_kind/get_spot_kinds?map_id=2&app_sn=ys_obc&lang=zh-cn",
+    resp = await transport.get(
+        f"{BASE_URL}/v1/map/spot_kind/get_spot_kinds"
+        "?map_id=2&app_sn=ys_obc&lang=zh-cn",
         headers={"Cookie": cookie},
     )
     data = _raise_for_retcode(resp)
@@ -136,8 +210,8 @@ async def get_spot_from_game(
     ids = [kind.id for kind in spot_kinds_data.list]
 
     # 3.获取坐标
-    resp = await API_CLIENT.post(
-        "/v1/map/spot/get_map_spots_by_kinds",
+    resp = await transport.post(
+        f"{BASE_URL}/v1/map/spot/get_map_spots_by_kinds",
         json={
             "map_id": str(map_id.value),
             "app_sn": "ys_obc",
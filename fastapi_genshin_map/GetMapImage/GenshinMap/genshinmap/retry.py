@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import time
+import random
+from json import JSONDecodeError
+from typing import Any, Dict
+
+from httpx import TransportError, HTTPStatusError
+
+
+class RetryPolicy:
+    """
+    请求失败时的重试策略：指数退避加随机抖动，限制重试次数与总耗时
+
+    参数：
+        max_attempts: `int` (default: 4)
+            最多请求次数（包括第一次）
+
+        base_delay: `float` (default: 0.5)
+            退避基数（秒），第 n 次重试前最多等待 `base_delay * 2 ** n` 秒
+
+        max_delay: `float` (default: 8)
+            单次等待的上限（秒）
+
+        deadline: `float` (default: 30)
+            单次调用（包括全部重试）的总时间预算（秒）
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8,
+        deadline: float = 30,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def configure(self, **options: Any) -> None:
+        for name, value in options.items():
+            if not hasattr(self, name):
+                raise TypeError(f"unknown retry option: {name}")
+            setattr(self, name, value)
+
+    def delay(self, attempt: int) -> float:
+        """第 `attempt` 次失败后的等待时间，在 0 到上限之间随机取值"""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """网络错误、5xx、429 与无法解析的响应可以重试，其余错误直接抛出"""
+        if isinstance(error, HTTPStatusError):
+            status = error.response.status_code
+            return status >= 500 or status == 429
+        # 网络错误与 JSON 解析错误
+        return isinstance(error, (TransportError, JSONDecodeError))
+
+
+class CircuitBreaker:
+    """
+    单个接口的熔断器
+
+    连续失败 `failure_threshold` 次后熔断，`reset_timeout` 秒内直接拒绝请求；
+    之后放行一个试探请求，成功则恢复，失败则继续熔断
+
+    参数：
+        failure_threshold: `int` (default: 5)
+            触发熔断的连续失败次数
+
+        reset_timeout: `float` (default: 30)
+            熔断持续时间（秒）
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_timeout: float = 30
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # 半开状态下是否有试探请求正在进行
+        self.probing = False
+        # 统计数据
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.rejected = 0
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        是否允许发起请求，熔断中时返回 `False`
+
+        熔断结束后只放行一个试探请求，试探结束前其余请求仍被拒绝
+        """
+        if self.state == self.OPEN and self.retry_after <= 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def release(self) -> None:
+        """请求未得出结果（例如被取消）时释放试探名额，由下一个请求重新试探"""
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.probing = False
+        self.errors += 1
+        self.failures += 1
+        if (
+            self.state == self.HALF_OPEN
+            or self.failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_after": round(self.retry_after, 3),
+            "calls": self.calls,
+            "retries": self.retries,
+            "errors": self.errors,
+            "rejected": self.rejected,
+        }
+
+
+policy = RetryPolicy()
+breakers: Dict[str, CircuitBreaker] = {}
+# 新建熔断器时使用的参数，见 `CircuitBreaker`
+breaker_options: Dict[str, Any] = {}
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    """按接口路径（不含参数）获取熔断器"""
+    path = endpoint.split("?", 1)[0]
+    breaker = breakers.get(path)
+    if breaker is None:
+        breaker = breakers[path] = CircuitBreaker(**breaker_options)
+    return breaker
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    """各接口的请求、重试与熔断状态，用于监控"""
+    return {path: breaker.stats() for path, breaker in breakers.items()}
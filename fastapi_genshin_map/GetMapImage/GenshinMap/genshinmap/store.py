@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from pathlib import Path
+from hashlib import blake2b
+from typing import Dict, List, Tuple, Union, Iterable, Optional, NamedTuple
+
+import numpy as np
+
+from .models import Point, XYPoint, XYZSPoint
+
+
+class PointColumns(NamedTuple):
+    """单个 Label 的坐标点列，均为 `PointStore` 内部数组的切片（不复制）"""
+
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    s: np.ndarray
+    area_id: np.ndarray
+    ctime: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def take(self, index: np.ndarray) -> "PointColumns":
+        """按下标选取部分坐标点，如 `cluster_indices` 返回的集群"""
+        return PointColumns(*(column[index] for column in self))
+
+    def to_xyzs(self) -> List[XYZSPoint]:
+        return [
+            XYZSPoint(*p)
+            for p in zip(
+                self.x.tolist(),
+                self.y.tolist(),
+                self.z.tolist(),
+                self.s.tolist(),
+            )
+        ]
+
+
+class PointStore:
+    """
+    按 Label ID 分组的列式坐标点存储
+
+    所有列按 `label_id` 排序，每个 Label 的坐标点是一段连续区间，
+    获取时直接返回切片；坐标在构建时已经加上地图 Origin
+
+    参数：
+        label_id, x, y, z, s, area_id, ctime: `Iterable`
+            各坐标点对应的列，长度必须一致
+
+        origin: `tuple[int, int]` (default: (0, 0))
+            米游社地图 Origin，可通过 `get_maps` 获取
+    """
+
+    def __init__(
+        self,
+        label_id: Iterable[int],
+        x: Iterable[float],
+        y: Iterable[float],
+        z: Iterable[int],
+        s: Iterable[int],
+        area_id: Iterable[int],
+        ctime: Iterable[str],
+        origin: Tuple[int, int] = (0, 0),
+    ) -> None:
+        label_ids = np.asarray(label_id, dtype=np.int64)
+        order = np.argsort(label_ids, kind="stable")
+        self.label_id = label_ids[order]
+        self.x = np.asarray(x, dtype=np.float64)[order] + origin[0]
+        self.y = np.asarray(y, dtype=np.float64)[order] + origin[1]
+        self.z = np.asarray(z, dtype=np.int16)[order]
+        self.s = np.asarray(s, dtype=np.int16)[order]
+        self.area_id = np.asarray(area_id, dtype=np.int32)[order]
+        self.ctime = np.asarray(ctime, dtype="datetime64[s]")[order]
+
+        labels, starts, counts = np.unique(
+            self.label_id, return_index=True, return_counts=True
+        )
+        self._offsets: Dict[int, Tuple[int, int]] = {
+            label: (start, start + count)
+            for label, start, count in zip(
+                labels.tolist(), starts.tolist(), counts.tolist()
+            )
+        }
+        self._bboxes: Dict[int, Tuple[XYPoint, XYPoint]] = {}
+        self._fingerprints: Dict[int, str] = {}
+        if len(labels):
+            min_x = np.minimum.reduceat(self.x, starts).tolist()
+            min_y = np.minimum.reduceat(self.y, starts).tolist()
+            max_x = np.maximum.reduceat(self.x, starts).tolist()
+            max_y = np.maximum.reduceat(self.y, starts).tolist()
+            for i, label in enumerate(labels.tolist()):
+                self._bboxes[label] = (
+                    XYPoint(min_x[i], min_y[i]),
+                    XYPoint(max_x[i], max_y[i]),
+                )
+
+    @classmethod
+    def from_points(
+        cls, points: List[Point], origin: Tuple[int, int] = (0, 0)
+    ) -> "PointStore":
+        """
+        根据 `get_points` 的结果构建
+
+        参数：
+            points: `list[Point]`
+                米游社坐标点列表，可通过 `get_points` 获取
+
+            origin: `tuple[int, int]` (default: (0, 0))
+                米游社地图 Origin，可通过 `get_maps` 获取
+
+        返回：
+            `PointStore`
+        """
+        return cls(
+            [p.label_id for p in points],
+            [p.x_pos for p in points],
+            [p.y_pos for p in points],
+            [p.z_level for p in points],
+            [p.icon_sign for p in points],
+            [p.area_id for p in points],
+            [p.ctime for p in points],
+            origin,
+        )
+
+    def save(self, file: Union[str, Path]) -> None:
+        """
+        将坐标点列保存为 `.npz` 文件，可通过 `PointStore.load` 读取
+
+        参数：
+            file: `str | pathlib.Path`
+                保存路径
+        """
+        with open(file, "wb") as f:
+            np.savez(
+                f,
+                label_id=self.label_id,
+                x=self.x,
+                y=self.y,
+                z=self.z,
+                s=self.s,
+                area_id=self.area_id,
+                ctime=self.ctime,
+            )
+
+    @classmethod
+    def load(cls, file: Union[str, Path]) -> "PointStore":
+        """
+        读取 `PointStore.save` 保存的坐标点列，坐标已包含地图 Origin
+
+        参数：
+            file: `str | pathlib.Path`
+                文件路径
+
+        返回：
+            `PointStore`
+        """
+        with np.load(file, allow_pickle=False) as data:
+            return cls(
+                data["label_id"],
+                data["x"],
+                data["y"],
+                data["z"],
+                data["s"],
+                data["area_id"],
+                data["ctime"],
+            )
+
+    def __len__(self) -> int:
+        return len(self.label_id)
+
+    def __contains__(self, label_id: int) -> bool:
+        return label_id in self._offsets
+
+    @property
+    def labels(self) -> List[int]:
+        return list(self._offsets)
+
+    def count(self, label_id: int) -> int:
+        """获取 Label 内坐标点数量"""
+        start, stop = self._offsets.get(label_id, (0, 0))
+        return stop - start
+
+    def bbox(self, label_id: int) -> Optional[Tuple[XYPoint, XYPoint]]:
+        """获取 Label 内坐标点的左上角与右下角，Label 不存在时返回 `None`"""
+        return self._bboxes.get(label_id)
+
+    def fingerprint(self, label_id: int) -> str:
+        """
+        根据 Label 内坐标点计算指纹，坐标点变化后指纹随之变化
+
+        参数：
+            label_id: `int`
+                Label ID
+
+        返回：
+            `str`
+        """
+        fingerprint = self._fingerprints.get(label_id)
+        if fingerprint is None:
+            columns = self.get(label_id)
+            digest = blake2b(digest_size=8)
+            for column in (columns.x, columns.y, columns.z, columns.s):
+                digest.update(column.tobytes())
+            fingerprint = self._fingerprints[label_id] = digest.hexdigest()
+        return fingerprint
+
+    def get(self, label_id: int) -> PointColumns:
+        """
+        根据 Label ID 获取坐标点列
+
+        参数：
+            label_id: `int`
+                Label ID
+
+        返回：
+            `PointColumns`，Label 不存在时各列为空
+        """
+        start, stop = self._offsets.get(label_id, (0, 0))
+        return PointColumns(
+            self.x[start:stop],
+            self.y[start:stop],
+            self.z[start:stop],
+            self.s[start:stop],
+            self.area_id[start:stop],
+            self.ctime[start:stop],
+        )
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from importlib.util import find_spec
+from typing import Any, Dict, Tuple, Optional
+
+from httpx import URL, Limits, Timeout, Response, AsyncClient
+
+from .logger import logger
+
+HostKey = Tuple[str, str, Optional[int]]
+
+
+class Transport:
+    """
+    按主机划分的共享 HTTP 连接池
+
+    每个主机使用一个长连接的 `AsyncClient`，其连接数上限即该主机的并发上限，
+    超出的请求会等待空闲连接
+
+    参数：
+        max_connections: `int` (default: 16)
+            每个主机的最大连接数
+
+        max_keepalive: `int` (default: 8)
+            每个主机保持的空闲连接数
+
+        keepalive_expiry: `float` (default: 30)
+            空闲连接保持的时间（秒）
+
+        connect_timeout: `float` (default: 10)
+            连接超时（秒）
+
+        read_timeout: `float` (default: 30)
+            读取超时（秒）
+
+        http2: `bool` (default: False)
+            是否启用 HTTP/2，需要安装 `h2`
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 16,
+        max_keepalive: int = 8,
+        keepalive_expiry: float = 30,
+        connect_timeout: float = 10,
+        read_timeout: float = 30,
+        http2: bool = False,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2
+        self._clients: Dict[HostKey, AsyncClient] = {}
+
+    def configure(self, **options: Any) -> None:
+        """修改连接池参数，只对之后新建的连接池生效"""
+        for name, value in options.items():
+            if not hasattr(self, name) or name.startswith("_"):
+                raise TypeError(f"unknown transport option: {name}")
+            setattr(self, name, value)
+
+    def client(self, url: str) -> AsyncClient:
+        """
+        获取 URL 所在主机的客户端，首次使用时才创建
+
+        参数：
+            url: `str`
+                完整 URL
+
+        返回：
+            `httpx.AsyncClient`
+        """
+        parsed = URL(url)
+        key = (parsed.scheme, parsed.host, parsed.port)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            http2 = self.http2
+            if http2 and find_spec("h2") is None:
+                logger.warning("[HTTP] 未安装 h2，无法启用 HTTP/2")
+                http2 = False
+            client = self._clients[key] = AsyncClient(
+                limits=Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                # 等待空闲连接不设超时，突发请求排队而不是失败
+                timeout=Timeout(
+                    self.read_timeout, connect=self.connect_timeout, pool=None
+                ),
+                http2=http2,
+            )
+        return client
+
+    async def get(self, url: str, **kwargs: Any) -> Response:
+        return await self.client(url).get(url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> Response:
+        return await self.client(url).post(url, **kwargs)
+
+    async def aclose(self) -> None:
+        """关闭全部连接池"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+transport = Transport()
@@ -2,20 +2,24 @@ from __future__ import annotations
 
 from math import ceil
 from io import BytesIO
-from typing import List, Tuple, Union
 from asyncio import gather, create_task
-from ...logger import logger
+from typing import List, Tuple, Union, TypeVar, Optional, Sequence
+
+import numpy as np
 from PIL import Image
-from httpx import AsyncClient
 
+from .logger import logger
+from .transport import transport
 from .models import Maps, Point, XYPoint, XYZSPoint
 
-CLIENT = AsyncClient()
+
+P = TypeVar("P", XYPoint, XYZSPoint)
+Box = Tuple[int, int, int, int]
 
 
 async def get_img(url: str) -> Image.Image:
     logger.info(f"[API] 正在下载 {url}")
-    resp = await CLIENT.get(url, timeout=600)
+    resp = await transport.get(url, timeout=600)
     resp.raise_for_status()
     return Image.open(BytesIO(resp.read()))
 
@@ -89,7 +93,7 @@ def get_points_by_id(id_: int, points: List[Point]) -> List[XYZSPoint]:
             米游社坐标点列表，可通过 `get_points` 获取
 
     返回：
-        `list[XYPoint]`
+        `list[XYZSPoint]`
     """
     return [
         XYZSPoint(point.x_pos, point.y_pos, point.z_level, point.icon_sign)
@@ -98,7 +102,7 @@ def get_points_by_id(id_: int, points: List[Point]) -> List[XYZSPoint]:
     ]
 
 
-def convert_pos(points: List[XYZSPoint], origin: List[int]) -> List[XYZSPoint]:
+def convert_pos(points: List[P], origin: Sequence[float]) -> List[P]:
     """
     将米游社资源坐标转换为以左上角为原点的坐标系的坐标
 
@@ -119,14 +123,134 @@ def convert_pos(points: List[XYZSPoint], origin: List[int]) -> List[XYZSPoint]:
         >>> convert_pos(points, origin)
         [XYPoint(x=6044, y=9335), XYPoint(x=644, y=6135)]
     """
+    if not points:
+        return []
+    x, y, *others = zip(*points)
+    x, y = convert_pos_array(np.array(x), np.array(y), origin)
     return [
-        XYZSPoint(x + origin[0], y + origin[1], z, s) for x, y, z, s in points
+        type(point)(*p)
+        for point, p in zip(points, zip(x.tolist(), y.tolist(), *others))
     ]
 
 
-def convert_pos_crop(
-    top_left_index: int, points: List[XYPoint]
-) -> List[XYPoint]:
+def convert_pos_array(
+    x: np.ndarray, y: np.ndarray, origin: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `convert_pos` 的数组版本，直接转换坐标列
+
+    参数：
+        x, y: `numpy.ndarray`
+            米游社资源坐标列，如 `PointColumns.x` 与 `PointColumns.y`
+
+        origin: `Sequence[float]`
+            米游社地图 Origin，可通过 `get_maps` 获取
+
+    返回：
+        `tuple[numpy.ndarray, numpy.ndarray]`，转换后的新数组
+    """
+    return np.asarray(x) + origin[0], np.asarray(y) + origin[1]
+
+
+def bbox_array(
+    x: np.ndarray, y: np.ndarray
+) -> Optional[Tuple[XYPoint, XYPoint]]:
+    """
+    计算坐标列的左上角与右下角
+
+    参数：
+        x, y: `numpy.ndarray`
+            坐标列
+
+    返回：
+        `tuple[XYPoint, XYPoint]`，没有坐标时返回 `None`
+    """
+    if not len(x):
+        return None
+    return (
+        XYPoint(np.min(x).item(), np.min(y).item()),
+        XYPoint(np.max(x).item(), np.max(y).item()),
+    )
+
+
+def crop_box_array(
+    x: np.ndarray,
+    y: np.ndarray,
+    padding: float = 0,
+    min_size: float = 0,
+    expand: float = 0,
+    size: Optional[Tuple[int, int]] = None,
+) -> Optional[Box]:
+    """
+    根据坐标列计算裁切范围
+
+    参数：
+        x, y: `numpy.ndarray`
+            坐标列（已经通过 `convert_pos` 转换）
+
+        padding: `float` (default: 0)
+            四周留出的距离
+
+        min_size: `float` (default: 0)
+            宽或高小于该值时，四周再扩大 `expand`
+
+        expand: `float` (default: 0)
+            范围过小时四周扩大的距离
+
+        size: `tuple[int, int] | None` (default: None)
+            地图大小，传入时裁切范围不超出地图
+
+    返回：
+        `tuple[int, int, int, int]`，即 (left, top, right, bottom)；
+        没有坐标或裁切范围完全在地图外时返回 `None`
+
+    示例：
+        >>> import numpy as np
+        >>> crop_box_array(np.array([100, 300]), np.array([50, 80]), 100)
+        (0, -50, 400, 180)
+        >>> crop_box_array(np.array([100]), np.array([50]), 0, 500, 400,
+        ...                size=(4096, 4096))
+        (0, 0, 500, 450)
+    """
+    return crop_box_bbox(bbox_array(x, y), padding, min_size, expand, size)
+
+
+def crop_box_bbox(
+    bbox: Optional[Tuple[XYPoint, XYPoint]],
+    padding: float = 0,
+    min_size: float = 0,
+    expand: float = 0,
+    size: Optional[Tuple[int, int]] = None,
+) -> Optional[Box]:
+    """
+    根据左上角与右下角计算裁切范围，如 `PointStore.bbox` 预先计算的结果
+
+    参数：
+        bbox: `tuple[XYPoint, XYPoint] | None`
+            坐标点的左上角与右下角（已经通过 `convert_pos` 转换）
+
+        其余参数同 `crop_box_array`
+
+    返回：
+        `tuple[int, int, int, int]`，即 (left, top, right, bottom)；
+        `bbox` 为 `None` 或裁切范围完全在地图外时返回 `None`
+    """
+    if bbox is None:
+        return None
+    box = np.array([*bbox[0], *bbox[1]], dtype=np.float64)
+    box += np.array([-padding, -padding, padding, padding])
+    if (box[2:] - box[:2] < min_size).any():
+        box += np.array([-expand, -expand, expand, expand])
+    if size is not None:
+        box = np.clip(box, 0, np.tile(size, 2))
+    left, top, right, bottom = box.astype(np.int64).tolist()
+    # 裁切到地图内后没有面积, 即坐标点都不在地图上
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def convert_pos_crop(top_left_index: int, points: List[P]) -> List[P]:
     """
     根据左上角地图切片的索引转换坐标（已经通过 `convert_pos` 转换）
 
@@ -152,16 +276,34 @@ def convert_pos_crop(
         >>> convert_pos_crop(5, points)
         [XYPoint(x=-4096, y=-4096),XYPoint(x=-4076, y=-4076)]
     """
-    y, x = divmod(top_left_index, 4)
-    if x == y == 0:
+    if top_left_index == 0 or not points:
         return points
-    x *= 4096
-    y *= 4096
-    result = []
-    for point in points:
-        px, py = point
-        result.append(XYPoint(px - x, py - y))
-    return result
+    x, y, *others = zip(*points)
+    x, y = convert_pos_crop_array(top_left_index, np.array(x), np.array(y))
+    return [
+        type(point)(*p)
+        for point, p in zip(points, zip(x.tolist(), y.tolist(), *others))
+    ]
+
+
+def convert_pos_crop_array(
+    top_left_index: int, x: np.ndarray, y: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `convert_pos_crop` 的数组版本
+
+    参数：
+        top_left_index: `int`
+            左上角地切片图的索引
+
+        x, y: `numpy.ndarray`
+            坐标列（已经通过 `convert_pos` 转换）
+
+    返回：
+        `tuple[numpy.ndarray, numpy.ndarray]`，转换后的新数组
+    """
+    row, column = divmod(top_left_index, 4)
+    return np.asarray(x) - column * 4096, np.asarray(y) - row * 4096
 
 
 def _pos_to_index(x: Union[int, float], y: Union[int, float]) -> int:
@@ -206,10 +348,32 @@ def crop_image_and_points(
         >>> crop_image_and_points(points)
         ([5, 9], 0, [XYPoint(x=104, y=3904), XYPoint(x=54, y=6144)])
     """
-    xs = [p.x for p in points]
-    ys = [p.y for p in points]
-    x1, y1 = min(xs), min(ys)
-    x2, y2 = max(xs), max(ys)
+    x, y, *_ = zip(*points)
+    indexes, interval, _ = crop_image_and_points_array(
+        np.array(x), np.array(y)
+    )
+    return indexes, interval, convert_pos_crop(indexes[0], points)
+
+
+def crop_image_and_points_array(
+    x: np.ndarray, y: np.ndarray
+) -> Tuple[List[int], int, Tuple[np.ndarray, np.ndarray]]:
+    """
+    `crop_image_and_points` 的数组版本
+
+    参数：
+        x, y: `numpy.ndarray`
+            坐标列（已经通过 `convert_pos` 转换）
+
+    返回：
+        `tuple[list[int], int, tuple[numpy.ndarray, numpy.ndarray]]`
+
+        第 3 个元素为使用 `convert_pos_crop_array` 转换后的坐标列
+    """
+    bbox = bbox_array(x, y)
+    if bbox is None:
+        raise ValueError("points must not be empty")
+    (x1, y1), (x2, y2) = bbox
 
     x1 = int(x1 // 4096 * 4096)
     x2 = x1 if x1 + 4096 >= x2 else ceil(x2 / 4096) * 4096 - 4096
@@ -219,5 +383,5 @@ def crop_image_and_points(
     return (
         _generate_matrix(index_x1, index_x2, _pos_to_index(x1, y2)),
         index_x2 - index_x1,
-        convert_pos_crop(index_x1, points),
+        convert_pos_crop_array(index_x1, x, y),
     )
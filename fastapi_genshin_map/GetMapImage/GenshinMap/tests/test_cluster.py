@@ -0,0 +1,50 @@
+def _points():
+    from genshinmap.models import XYZSPoint
+
+    return [
+        # Cluster 1
+        XYZSPoint(9, 9, 1, 0),
+        XYZSPoint(10, 10, 2, 1),
+        XYZSPoint(11, 11, 1, 3),
+        XYZSPoint(12, 12, 1, 0),
+        XYZSPoint(13, 13, 1, 0),
+        # Cluster 2
+        XYZSPoint(100, 100, 1, 0),
+        XYZSPoint(101, 101, 1, 0),
+        XYZSPoint(102, 102, 1, 0),
+    ]
+
+
+def test_cluster_points() -> None:
+    from genshinmap.models import XYPoint
+    from genshinmap.cluster import ALGORITHMS, cluster_points
+
+    points = _points()
+    for algorithm in ALGORITHMS:
+        clusters = cluster_points(points, 15, 2, algorithm)
+        assert clusters[0].top_left == XYPoint(9, 9)
+        assert clusters[0].bottom_right == XYPoint(13, 13)
+        # 层级与角标保持不变
+        assert clusters[0].points == points[:5]
+        assert clusters[1].points == points[5:]
+
+
+def test_cluster_points_deterministic() -> None:
+    import random
+
+    from genshinmap.models import XYZSPoint
+    from genshinmap.cluster import cluster_points
+
+    rng = random.Random(0)
+    points = [
+        XYZSPoint(rng.uniform(0, 5000), rng.uniform(0, 5000), 1, 0)
+        for _ in range(500)
+    ]
+    assert cluster_points(points, seed=1) == cluster_points(points, seed=1)
+
+
+def test_cluster_indices_empty() -> None:
+    import numpy as np
+    from genshinmap.cluster import cluster_indices
+
+    assert cluster_indices(np.array([]), np.array([])) == []
@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+import pytest
+
+DIR = Path(__file__).parent
+
+
+def test_decode_points() -> None:
+    from genshinmap.models import Point
+    from genshinmap.store import PointStore
+    from genshinmap.decode import decode_points
+
+    with open(DIR / "points.json", encoding="utf-8") as f:
+        point_list = json.load(f)["point_list"]
+    expected = PointStore.from_points(
+        [Point.parse_obj(i) for i in point_list], (4844, 4335)
+    )
+    store = decode_points(point_list, (4844, 4335))
+    assert store.labels == expected.labels
+    for label in store.labels:
+        assert store.get(label).to_xyzs() == expected.get(label).to_xyzs()
+        assert store.fingerprint(label) == expected.fingerprint(label)
+    assert store.ctime.tolist() == expected.ctime.tolist()
+    assert store.area_id.tolist() == expected.area_id.tolist()
+
+
+def test_decode_points_invalid() -> None:
+    from genshinmap.decode import decode_points
+
+    with open(DIR / "points.json", encoding="utf-8") as f:
+        point_list = json.load(f)["point_list"]
+    point_list[0]["x_pos"] = "abc"
+    with pytest.raises(ValueError, match="x_pos"):
+        decode_points(point_list)
+    del point_list[1]["label_id"]
+    with pytest.raises(ValueError, match="label_id"):
+        decode_points(point_list)
+
+
+def test_decode_labels() -> None:
+    from genshinmap.models import Tree
+    from genshinmap.decode import decode_labels
+
+    with open(DIR / "labels.json", encoding="utf-8") as f:
+        tree = json.load(f)["tree"]
+    records = decode_labels(tree)
+    trees = [Tree.parse_obj(i) for i in tree]
+    assert [(r.id, r.name, r.icon) for r in records] == [
+        (t.id, t.name, t.icon) for t in trees
+    ]
+    assert [
+        (c.id, c.name, c.icon) for r in records for c in r.children
+    ] == [(c.id, c.name, str(c.icon)) for t in trees for c in t.children]
+    assert decode_labels([r.to_dict() for r in records]) == records
+
+    with pytest.raises(ValueError):
+        decode_labels([{"id": 1}])
@@ -15,3 +15,21 @@ def test_anchor_points() -> None:
         XYPoint(-5617, 4750),
         XYPoint(-6081, 4848),
     ]
+
+
+def test_models_round_trip() -> None:
+    from genshinmap.models import Tree, MapInfo, PageLabel
+
+    directory = Path(__file__).parent
+    with open(directory / "maps.json", encoding="utf-8") as f:
+        info = MapInfo.parse_obj(json.load(f)["info"])
+    with open(directory / "page.json", encoding="utf-8") as f:
+        pages = [PageLabel.parse_obj(i) for i in json.load(f)["list"]]
+    with open(directory / "labels.json", encoding="utf-8") as f:
+        trees = [Tree.parse_obj(i) for i in json.load(f)["tree"]]
+
+    # 解析后的结果可以再次解析，用于保存与读取快照
+    assert MapInfo.parse_obj(info.dict()) == info
+    assert info.detail is not None and info.detail.slices
+    assert [PageLabel.parse_obj(i.dict()) for i in pages] == pages
+    assert [Tree.parse_obj(i.dict()) for i in trees] == trees
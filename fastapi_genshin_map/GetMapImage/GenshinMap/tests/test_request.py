@@ -243,3 +243,23 @@ async def test_connection(map_id) -> None:
     assert await get_page_label(map_id)
     assert await get_maps(map_id)
     assert await get_points(map_id)
+
+
+@pytest.mark.asyncio
+async def test_point_store(monkeypatch: pytest.MonkeyPatch) -> None:
+    with open(DIR / "points.json", encoding="utf-8") as f:
+        data = json.load(f)
+
+    async def _fake_request(endpoint: str) -> Dict[str, Any]:
+        return data
+
+    monkeypatch.setattr("genshinmap.request._request", _fake_request)
+
+    from genshinmap.models import XYZSPoint
+    from genshinmap.request import MapID, get_point_store
+
+    store = await get_point_store(MapID.teyvat, (1, 2))
+    assert store.get(298).to_xyzs() == [
+        XYZSPoint(115, 516, 1, 0),
+        XYZSPoint(1920, 812, 2, 1),
+    ]
@@ -0,0 +1,240 @@
+from typing import TYPE_CHECKING, List
+
+import pytest
+
+if TYPE_CHECKING:
+    from httpx import Response
+
+
+@pytest.fixture
+def no_delay(monkeypatch: pytest.MonkeyPatch) -> None:
+    from genshinmap.retry import RetryPolicy
+
+    monkeypatch.setattr(
+        "genshinmap.request.policy", RetryPolicy(base_delay=0, max_delay=0)
+    )
+    monkeypatch.setattr("genshinmap.retry.breakers", {})
+
+
+def _fake_get(statuses: List[int], calls: List[str]):
+    async def _get(self, url: str) -> "Response":
+        from httpx import Request, Response
+
+        calls.append(url)
+        status = statuses.pop(0) if statuses else 200
+        return Response(
+            status,
+            text='{"retcode":0,"message":"OK","data":{"test": 1}}',
+            request=Request("GET", url),
+        )
+
+    return _get
+
+
+def test_retry_policy_delay() -> None:
+    from genshinmap.retry import RetryPolicy
+
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt) <= min(4, 2**attempt)
+
+
+def test_retry_policy_is_retryable() -> None:
+    from httpx import Request, Response, ConnectError, HTTPStatusError
+
+    from genshinmap.exc import StatusError
+    from genshinmap.retry import RetryPolicy
+
+    def _status_error(status: int) -> HTTPStatusError:
+        request = Request("GET", "https://example.com")
+        response = Response(status, request=request)
+        return HTTPStatusError("", request=request, response=response)
+
+    assert RetryPolicy.is_retryable(_status_error(503))
+    assert RetryPolicy.is_retryable(_status_error(429))
+    assert not RetryPolicy.is_retryable(_status_error(404))
+    assert RetryPolicy.is_retryable(ConnectError(""))
+    assert not RetryPolicy.is_retryable(StatusError(1, "err"))
+
+
+def test_circuit_breaker() -> None:
+    from genshinmap.retry import CircuitBreaker
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+    # 熔断结束后放行一个试探请求，失败则重新熔断
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    assert breaker.state == breaker.HALF_OPEN
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_request_retry(
+    monkeypatch: pytest.MonkeyPatch, no_delay: None
+) -> None:
+    calls: List[str] = []
+    monkeypatch.setattr(
+        "httpx._client.AsyncClient.get", _fake_get([503, 502], calls)
+    )
+    from genshinmap.request import _request
+    from genshinmap.retry import get_stats
+
+    assert await _request("/retry?a=1") == {"test": 1}
+    assert len(calls) == 3
+    stats = get_stats()["/retry"]
+    assert stats["calls"] == 1
+    assert stats["retries"] == 2
+    assert stats["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_request_max_attempts(
+    monkeypatch: pytest.MonkeyPatch, no_delay: None
+) -> None:
+    calls: List[str] = []
+    monkeypatch.setattr(
+        "httpx._client.AsyncClient.get", _fake_get([503] * 10, calls)
+    )
+    from httpx import HTTPStatusError
+
+    from genshinmap.request import _request
+
+    with pytest.raises(HTTPStatusError):
+        await _request("/attempts")
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_request_not_retryable(
+    monkeypatch: pytest.MonkeyPatch, no_delay: None
+) -> None:
+    calls: List[str] = []
+    monkeypatch.setattr(
+        "httpx._client.AsyncClient.get", _fake_get([404], calls)
+    )
+    from httpx import HTTPStatusError
+
+    from genshinmap.request import _request
+    from genshinmap.retry import get_stats
+
+    with pytest.raises(HTTPStatusError):
+        await _request("/missing")
+    assert len(calls) == 1
+    assert get_stats()["/missing"]["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_request_circuit_open(
+    monkeypatch: pytest.MonkeyPatch, no_delay: None
+) -> None:
+    calls: List[str] = []
+    monkeypatch.setattr(
+        "httpx._client.AsyncClient.get", _fake_get([503] * 10, calls)
+    )
+    from httpx import HTTPStatusError
+
+    from genshinmap.request import _request
+    from genshinmap.exc import CircuitOpenError
+    from genshinmap.retry import get_stats, get_breaker
+
+    get_breaker("/down").failure_threshold = 2
+    with pytest.raises(CircuitOpenError) as exc_info:
+        await _request("/down")
+    assert exc_info.value.endpoint == "/down"
+    assert len(calls) == 2
+
+    with pytest.raises(CircuitOpenError):
+        await _request("/down?page=2")
+    assert len(calls) == 2
+    assert get_stats()["/down"]["state"] == "open"
+    assert get_stats()["/down"]["rejected"] == 2
+    assert not isinstance(exc_info.value, HTTPStatusError)
+
+
+@pytest.mark.asyncio
+async def test_request_half_open_single_probe(
+    monkeypatch: pytest.MonkeyPatch, no_delay: None
+) -> None:
+    import asyncio
+
+    calls: List[str] = []
+    fake_get = _fake_get([], calls)
+
+    async def _slow_get(self, url: str) -> "Response":
+        await asyncio.sleep(0.01)
+        return await fake_get(self, url)
+
+    monkeypatch.setattr("httpx._client.AsyncClient.get", _slow_get)
+    from genshinmap.request import _request
+    from genshinmap.exc import CircuitOpenError
+    from genshinmap.retry import get_breaker
+
+    breaker = get_breaker("/recover")
+    breaker.failure_threshold = 1
+    breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+
+    # 熔断结束后只有一个试探请求到达上游
+    results = await asyncio.gather(
+        *[_request("/recover") for _ in range(10)], return_exceptions=True
+    )
+    assert len(calls) == 1
+    assert results.count({"test": 1}) == 1
+    assert sum(isinstance(r, CircuitOpenError) for r in results) == 9
+    assert breaker.state == breaker.CLOSED
+    assert not breaker.probing
+
+    assert await _request("/recover") == {"test": 1}
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_request_half_open_not_retryable(
+    monkeypatch: pytest.MonkeyPatch, no_delay: None
+) -> None:
+    calls: List[str] = []
+    monkeypatch.setattr(
+        "httpx._client.AsyncClient.get", _fake_get([404], calls)
+    )
+    from httpx import HTTPStatusError
+
+    from genshinmap.request import _request
+    from genshinmap.retry import get_breaker
+
+    breaker = get_breaker("/probe")
+    breaker.failure_threshold = 1
+    breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+
+    # 试探请求得到 404 时上游可用，熔断结束
+    with pytest.raises(HTTPStatusError):
+        await _request("/probe")
+    assert breaker.state == breaker.CLOSED
+    assert not breaker.probing
+    assert await _request("/probe") == {"test": 1}
+
+
+def test_circuit_breaker_release() -> None:
+    from genshinmap.retry import CircuitBreaker
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    assert not breaker.allow()
+    # 试探请求被取消后由下一个请求重新试探
+    breaker.release()
+    assert breaker.allow()
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+
+DIR = Path(__file__).parent
+
+
+def _load_store(origin=(0, 0)):
+    from genshinmap.models import Point
+    from genshinmap.store import PointStore
+
+    with open(DIR / "points.json", encoding="utf-8") as f:
+        points = [Point.parse_obj(i) for i in json.load(f)["point_list"]]
+    return PointStore.from_points(points, origin)
+
+
+def test_point_store_get() -> None:
+    from genshinmap.models import XYZSPoint
+
+    store = _load_store((4844, 4335))
+    assert len(store) == 3
+    assert store.labels == [297, 298]
+    assert store.count(298) == 2
+    assert store.get(298).to_xyzs() == [
+        XYZSPoint(4958, 4849, 1, 0),
+        XYZSPoint(6763, 5145, 2, 1),
+    ]
+    assert 297 in store
+    assert 1 not in store
+    assert len(store.get(1)) == 0
+
+
+def test_point_store_zero_copy() -> None:
+    store = _load_store()
+    columns = store.get(298)
+    assert columns.x.base is store.x
+    assert columns.area_id.tolist() == [1, 1]
+    assert str(columns.ctime[0]) == "2022-06-16T10:26:12"
+
+
+def test_point_columns_take() -> None:
+    import numpy as np
+    from genshinmap.models import XYZSPoint
+
+    store = _load_store((4844, 4335))
+    columns = store.get(298).take(np.array([1]))
+    assert columns.to_xyzs() == [XYZSPoint(6763, 5145, 2, 1)]
+    assert columns.area_id.tolist() == [1]
+
+
+def test_point_store_bbox() -> None:
+    from genshinmap.models import XYPoint
+
+    store = _load_store()
+    assert store.bbox(298) == (XYPoint(114, 514), XYPoint(1919, 810))
+    assert store.bbox(297) == (XYPoint(-1287.5, 716), XYPoint(-1287.5, 716))
+    assert store.bbox(1) is None
+
+
+def test_point_store_fingerprint() -> None:
+    store = _load_store()
+    assert store.fingerprint(298) == _load_store().fingerprint(298)
+    assert store.fingerprint(298) != store.fingerprint(297)
+    assert store.fingerprint(298) != _load_store((1, 0)).fingerprint(298)
+
+
+def test_point_store_save_load(tmp_path: Path) -> None:
+    from genshinmap.store import PointStore
+
+    store = _load_store((4844, 4335))
+    store.save(tmp_path / "points.npz")
+    loaded = PointStore.load(tmp_path / "points.npz")
+    assert loaded.labels == store.labels
+    assert loaded.get(298).to_xyzs() == store.get(298).to_xyzs()
+    assert loaded.get(298).ctime.tolist() == store.get(298).ctime.tolist()
+    assert loaded.bbox(297) == store.bbox(297)
+    assert loaded.fingerprint(298) == store.fingerprint(298)
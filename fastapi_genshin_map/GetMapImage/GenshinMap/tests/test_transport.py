@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_transport_client_per_host() -> None:
+    from genshinmap.transport import Transport
+
+    transport = Transport(max_connections=4, connect_timeout=5)
+    client = transport.client("https://example.com/a")
+    assert transport.client("https://example.com/b") is client
+    assert transport.client("https://example.org/a") is not client
+    assert client.timeout.connect == 5
+
+    await transport.aclose()
+    assert client.is_closed
+    assert transport.client("https://example.com/a") is not client
+    await transport.aclose()
+
+
+def test_transport_configure() -> None:
+    from genshinmap.transport import Transport
+
+    transport = Transport()
+    transport.configure(read_timeout=60)
+    assert transport.read_timeout == 60
+    with pytest.raises(TypeError):
+        transport.configure(unknown=1)
@@ -5,14 +5,14 @@ DIR = Path(__file__).parent
 
 
 def test_get_points_by_id() -> None:
-    from genshinmap.models import Point, XYPoint
+    from genshinmap.models import Point, XYZSPoint
     from genshinmap.utils import get_points_by_id
 
     with open(DIR / "points.json") as f:
         points = [Point.parse_obj(i) for i in json.load(f)["point_list"]]
     assert get_points_by_id(298, points) == [
-        XYPoint(114, 514),
-        XYPoint(1919, 810),
+        XYZSPoint(114, 514, 1, 0),
+        XYZSPoint(1919, 810, 2, 1),
     ]
 
 
@@ -92,3 +92,38 @@ def test_crop_image_and_points() -> None:
         1,
         points,
     )
+
+
+def test_convert_pos_array() -> None:
+    import numpy as np
+    from genshinmap.utils import convert_pos_array
+
+    x, y = convert_pos_array(
+        np.array([1200, -4200]), np.array([5000, 1800]), [4844, 4335]
+    )
+    assert x.tolist() == [6044, 644]
+    assert y.tolist() == [9335, 6135]
+
+
+def test_crop_box_array() -> None:
+    import numpy as np
+    from genshinmap.utils import crop_box_array
+
+    x, y = np.array([100, 300]), np.array([50, 80])
+    assert crop_box_array(x, y, 100) == (0, -50, 400, 180)
+    assert crop_box_array(x, y, 100, 500, 400) == (-400, -450, 800, 580)
+    assert crop_box_array(x, y, 100, 500, 400, (600, 600)) == (0, 0, 600, 580)
+    assert crop_box_array(np.array([]), np.array([])) is None
+
+
+def test_crop_box_bbox() -> None:
+    from genshinmap.models import XYPoint
+    from genshinmap.utils import crop_box_bbox
+
+    bbox = (XYPoint(100, 50), XYPoint(300, 80))
+    assert crop_box_bbox(bbox, 100, 500, 400) == (-400, -450, 800, 580)
+    assert crop_box_bbox(None) is None
+    # 坐标点都在地图外时裁切后没有面积
+    off_map = (XYPoint(5000, 5000), XYPoint(6000, 6000))
+    assert crop_box_bbox(off_map, 100, size=(4096, 4096)) is None
+    assert crop_box_bbox(bbox, size=(200, 200)) == (100, 50, 200, 80)
@@ -0,0 +1,156 @@
+import re
+import time
+import bisect
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+from .logger import logger
+
+ALIAS_PATH = Path(__file__).parent / 'map.yaml'
+# 输入少于该长度时只按前缀提示, 单字与任意单字名称的编辑距离都不超过 1
+MIN_FUZZY_LENGTH = 2
+
+ROMAN_NUMERALS = {
+    'i': '1',
+    'ii': '2',
+    'iii': '3',
+    'iv': '4',
+    'v': '5',
+    'vi': '6',
+    'vii': '7',
+    'viii': '8',
+    'ix': '9',
+    'x': '10',
+}
+# 只转换跟在非字母后的罗马数字, 如 键纹Ⅱ -> 键纹2
+ROMAN_SUFFIX = re.compile(r'(?<=[^a-z])(?:viii|vii|vi|iv|ix|v|x|i{1,3})$')
+
+
+def normalize_alias(name: str) -> str:
+    '''全角转半角、Ⅰ 转 I、统一小写并去除空白, 末尾的罗马数字转为阿拉伯数字'''
+    name = unicodedata.normalize('NFKC', name).lower()
+    name = ''.join(name.split())
+    return ROMAN_SUFFIX.sub(lambda m: ROMAN_NUMERALS[m.group()], name)
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ca != cb),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+class AliasIndex:
+    '''
+    资源别名索引, 由 map.yaml 编译为 规范化别名 -> 资源名称 的字典
+
+    map.yaml 修改后会在下次查询时自动重新编译
+    '''
+
+    # 检查 map.yaml 是否修改的最小间隔(秒)
+    check_interval = 5.0
+
+    def __init__(self, path: Path = ALIAS_PATH):
+        self.path = path
+        self.mtime: Optional[int] = None
+        self.names: Dict[str, str] = {}
+        self.keys: List[str] = []
+        self.lengths: Dict[int, List[str]] = {}
+        self._checked = 0.0
+
+    def compile(self):
+        mtime = self.path.stat().st_mtime_ns
+        with open(self.path, 'r', encoding='utf-8') as f:
+            categories = yaml.load(f, Loader=yaml.SafeLoader)
+
+        names: Dict[str, str] = {}
+        for resources in categories.values():
+            for name, aliases in resources.items():
+                # 与 map.yaml 中的顺序一致, 重复的别名以先出现的为准
+                for alias in [name, *(aliases or [])]:
+                    names.setdefault(normalize_alias(str(alias)), name)
+        lengths: Dict[int, List[str]] = {}
+        for alias in names:
+            lengths.setdefault(len(alias), []).append(alias)
+        self.names = names
+        self.keys = sorted(names)
+        self.lengths = lengths
+        self.mtime = mtime
+        logger.info(f'[别名] 已加载 {len(names)} 个资源别名')
+
+    def _check_reload(self):
+        now = time.monotonic()
+        checked = now - self._checked < self.check_interval
+        if self.mtime is not None and checked:
+            return
+        self._checked = now
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.mtime:
+            try:
+                self.compile()
+            except Exception as e:
+                # 修改中的文件可能无法解析, 保留上一次的结果
+                logger.warning(f'[别名] 加载 {self.path.name} 失败: {e}')
+
+    def resolve(self, name: str) -> str:
+        '''将别名转换为资源名称, 不存在时原样返回'''
+        self._check_reload()
+        return self.names.get(normalize_alias(name), name)
+
+    def suggest(self, name: str, limit: int = 3) -> List[str]:
+        '''找不到资源时, 按前缀与编辑距离给出最接近的资源名称'''
+        self._check_reload()
+        key = normalize_alias(name)
+        if not key:
+            return []
+
+        suggestions: List[str] = []
+
+        def _add(alias: str):
+            resource = self.names[alias]
+            if resource not in suggestions:
+                suggestions.append(resource)
+
+        # 以输入为前缀的别名
+        start = bisect.bisect_left(self.keys, key)
+        for alias in self.keys[start:]:
+            if not alias.startswith(key) or len(suggestions) >= limit:
+                break
+            _add(alias)
+
+        if len(key) < MIN_FUZZY_LENGTH:
+            return suggestions
+
+        # 编辑距离不超过输入长度一半的别名
+        max_distance = max(1, len(key) // 2)
+        candidates = []
+        for length in range(
+            len(key) - max_distance, len(key) + max_distance + 1
+        ):
+            for alias in self.lengths.get(length, []):
+                distance = edit_distance(key, alias)
+                if distance <= max_distance:
+                    candidates.append((distance, alias))
+        for _, alias in sorted(candidates):
+            if len(suggestions) >= limit:
+                break
+            _add(alias)
+        return suggestions
+
+
+alias_index = AliasIndex()
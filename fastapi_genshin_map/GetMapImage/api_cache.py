@@ -0,0 +1,131 @@
+import time
+import asyncio
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+    Generic,
+    TypeVar,
+    Callable,
+    Optional,
+    Awaitable,
+)
+
+from .logger import logger
+from .config import API_CACHE_TTL
+from .label_index import LabelIndex, ResourceIndex, load_label_index
+from .GenshinMap.genshinmap import models, request
+from .GenshinMap.genshinmap.store import PointStore
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class TTLCache(Generic[K, V]):
+    '''
+    带有效期的异步缓存
+
+    - 未命中时请求上游, 同一个 key 的并发请求只会发起一次
+    - 过期后直接返回旧数据, 同时在后台刷新
+    - 刷新失败时继续使用最后一次成功的数据
+    - 离线模式下只使用已有数据, 不请求上游
+    '''
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[K], Awaitable[V]],
+        ttl: float = API_CACHE_TTL,
+    ):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._data: Dict[K, Tuple[float, V]] = {}
+        self._tasks: Dict[K, 'asyncio.Task[V]'] = {}
+        self.offline = False
+
+    async def get(self, key: K) -> V:
+        entry = self._data.get(key)
+        if entry is None:
+            if self.offline:
+                raise KeyError(f'离线模式下没有 {self.name}[{key}] 的数据')
+            return await asyncio.shield(self._schedule(key))
+        if not self.offline and time.monotonic() - entry[0] > self.ttl:
+            self._schedule(key)
+        return entry[1]
+
+    def put(self, key: K, value: V, age: float = 0):
+        '''写入数据, age 为数据已存在的时间(秒), 超过有效期时下次读取会在后台刷新'''
+        self._data[key] = (time.monotonic() - age, value)
+
+    def peek(self, key: K) -> Optional[V]:
+        entry = self._data.get(key)
+        return None if entry is None else entry[1]
+
+    def invalidate(self, key: Optional[K] = None):
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def _schedule(self, key: K) -> 'asyncio.Task[V]':
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._refresh(key))
+        return self._tasks[key]
+
+    async def _refresh(self, key: K) -> V:
+        try:
+            value = await self.loader(key)
+        except Exception as e:
+            entry = self._data.get(key)
+            if entry is None:
+                raise
+            logger.warning(f'[缓存] 刷新 {self.name}[{key}] 失败, 使用旧数据: {e}')
+            return entry[1]
+        else:
+            self._data[key] = (time.monotonic(), value)
+            logger.info(f'[缓存] 已刷新 {self.name}[{key}]')
+            return value
+        finally:
+            self._tasks.pop(key, None)
+
+
+maps_cache: TTLCache[models.MapID, models.MapInfo] = TTLCache(
+    'maps', request.get_maps
+)
+labels_cache: TTLCache[models.MapID, LabelIndex] = TTLCache(
+    'labels', load_label_index
+)
+
+
+async def load_point_store(map_id: models.MapID) -> PointStore:
+    maps = await maps_cache.get(map_id)
+    return await request.get_point_store(map_id, maps.get_detail.origin)
+
+
+points_cache: TTLCache[models.MapID, PointStore] = TTLCache(
+    'points', load_point_store
+)
+
+
+def invalidate_all(map_id: Optional[models.MapID] = None):
+    cache: TTLCache[models.MapID, Any]
+    for cache in (maps_cache, labels_cache, points_cache):
+        cache.invalidate(map_id)
+
+
+_resource_index: Optional[ResourceIndex] = None
+
+
+async def get_resource_index(map_ids: List[models.MapID]) -> ResourceIndex:
+    '''获取全部地图的资源索引, 各地图的资源与坐标点均来自缓存'''
+    global _resource_index
+    labels, points = await asyncio.gather(
+        asyncio.gather(*[labels_cache.get(map_id) for map_id in map_ids]),
+        asyncio.gather(*[points_cache.get(map_id) for map_id in map_ids]),
+    )
+    sources = dict(zip(map_ids, zip(labels, points)))
+    if _resource_index is None or not _resource_index.is_built_from(sources):
+        _resource_index = ResourceIndex(sources)
+    return _resource_index
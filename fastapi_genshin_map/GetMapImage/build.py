@@ -0,0 +1,173 @@
+import json
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .logger import logger
+from .render import MP_CONTEXT
+from .sprite import sprite_cache
+from .raw_map import export_png, build_pyramid
+from .config import SAVE_MAP_PNG, BUILD_WORKERS
+from .GenshinMap.genshinmap import models
+from .api_cache import maps_cache, points_cache, invalidate_all
+from .download import (
+    update_world,
+    download_P0_map,
+    get_map_version,
+    remove_old_tiles,
+    move_legacy_tiles,
+    stitch_P0_map_raw,
+)
+
+MAP = Path(__file__).parent / 'map_data'
+MANIFEST_PATH = MAP / 'manifest.json'
+
+Anchors = List[Tuple[float, float]]
+
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    '''记录已完成的构建步骤, 中断后重启时跳过已完成的地图'''
+    if not MANIFEST_PATH.exists():
+        return {}
+    with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update_manifest(map_id: models.MapID, **kwargs: Any):
+    manifest = load_manifest()
+    manifest.setdefault(map_id.name, {}).update(kwargs)
+    tmp_path = MANIFEST_PATH.with_name(f'{MANIFEST_PATH.name}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(MANIFEST_PATH)
+
+
+def is_map_built(map_id: models.MapID) -> bool:
+    # 原始地图为原子替换, 存在即说明该地图已完整拼接
+    if not (MAP / f'{map_id.name}.npy').exists():
+        return False
+    return not SAVE_MAP_PNG or (MAP / f'{map_id.name}.png').exists()
+
+
+def stitch_map(
+    map_id: models.MapID,
+    detail_v2: models.DetailV2,
+    mark_god: Anchors,
+    mark_trans: Anchors,
+    version: str,
+):
+    '''拼接地图并绘制七天神像与传送锚点, 在子进程中运行'''
+    mark_god_pic = sprite_cache.textures['mark_god']
+    mark_trans_pic = sprite_cache.textures['mark_trans']
+    overlays = [
+        (mark_god_pic, (int(x) - 32, int(y) - 64)) for x, y in mark_god
+    ] + [(mark_trans_pic, (int(x) - 32, int(y) - 64)) for x, y in mark_trans]
+
+    raw_path = MAP / f'{map_id.name}.npy'
+    # 按行带直接写入原始地图, 不在内存中保留整张地图
+    stitch_P0_map_raw(
+        map_id.value, detail_v2, raw_path, overlays, version=version
+    )
+    # 缩小的地图层级, 大范围的资源图从中裁切
+    build_pyramid(raw_path)
+    if SAVE_MAP_PNG:
+        export_png(raw_path, MAP / f'{map_id.name}.png')
+
+
+async def build_maps(map_ids: List[models.MapID]):
+    '''下载并拼接尚未构建的地图'''
+    MAP.mkdir(exist_ok=True)
+    pending = [map_id for map_id in map_ids if not is_map_built(map_id)]
+    if not pending:
+        return
+
+    # 自动更新地图
+    await update_world()
+    # 旧版本下载的切片移入当前版本的目录, 无需重新下载
+    for map_id in pending:
+        move_legacy_tiles(map_id.value)
+    for map_id in await stitch_maps(pending):
+        remove_old_tiles(map_id.value, get_map_version(map_id.value))
+
+
+async def refresh_maps(map_ids: List[models.MapID]) -> List[models.MapID]:
+    '''检查地图版本, 只重新构建版本有变化的地图, 返回有变化的地图'''
+    await update_world()
+    manifest = load_manifest()
+    changed = []
+    for map_id in map_ids:
+        version = get_map_version(map_id.value)
+        built_version = manifest.get(map_id.name, {}).get('map_version')
+        if version is None or version == built_version:
+            continue
+        if built_version is None:
+            # 旧版本构建的地图没有记录版本, 直接采用当前版本
+            update_manifest(map_id, map_version=version)
+            move_legacy_tiles(map_id.value, version)
+            continue
+        logger.info(f'[更新] 地图 {map_id.name} 版本 {built_version} -> {version}')
+        changed.append(map_id)
+
+    if not changed:
+        return changed
+    for map_id in changed:
+        invalidate_all(map_id)
+    # 构建失败的地图保留原有地图, 版本未记录, 下次检查时重试
+    changed = await stitch_maps(changed)
+    for map_id in changed:
+        remove_old_tiles(map_id.value, get_map_version(map_id.value))
+    return changed
+
+
+async def stitch_maps(map_ids: List[models.MapID]) -> List[models.MapID]:
+    '''
+    下载切片并拼接地图, 返回构建成功的地图
+
+    切片下载完成后立即交给进程池拼接, 下载下一张地图时上一张仍在拼接;
+    单张地图失败时记录日志, 不影响其余地图
+    '''
+    loop = asyncio.get_running_loop()
+    finished = 0
+
+    async def _stitch(
+        executor: ProcessPoolExecutor, map_id, maps, points
+    ) -> bool:
+        nonlocal finished
+        god = points.get(2)
+        trans = points.get(3)
+        version = get_map_version(maps.id)
+        try:
+            await loop.run_in_executor(
+                executor,
+                stitch_map,
+                map_id,
+                maps.get_detail,
+                list(zip(god.x.tolist(), god.y.tolist())),
+                list(zip(trans.x.tolist(), trans.y.tolist())),
+                version,
+            )
+        except Exception as e:
+            logger.warning(f'[构建] 地图 {map_id.name} 拼接失败: {e}')
+            return False
+        update_manifest(map_id, map_version=version, prerendered=False)
+        finished += 1
+        logger.info(f'[构建] 地图 {map_id.name} 完成 ({finished}/{len(map_ids)})')
+        return True
+
+    workers = min(BUILD_WORKERS, len(map_ids))
+    with ProcessPoolExecutor(workers, mp_context=MP_CONTEXT) as executor:
+        tasks: Dict[models.MapID, 'asyncio.Future[bool]'] = {}
+        for map_id in map_ids:
+            try:
+                maps = await maps_cache.get(map_id)
+                points = await points_cache.get(map_id)
+                await download_P0_map(maps.id, maps.get_detail)
+            except Exception as e:
+                logger.warning(f'[构建] 地图 {map_id.name} 下载失败: {e}')
+                continue
+            tasks[map_id] = asyncio.ensure_future(
+                _stitch(executor, map_id, maps, points)
+            )
+        results = await asyncio.gather(*tasks.values())
+    return [map_id for map_id, ok in zip(tasks, results) if ok]
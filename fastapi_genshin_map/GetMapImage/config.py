@@ -0,0 +1,70 @@
+import os
+
+# 米游社接口缓存有效期(秒), 过期后先返回旧数据并在后台刷新
+API_CACHE_TTL = float(os.getenv('GSMAP_API_CACHE_TTL', 1800))
+
+# 离线模式: 只使用磁盘上的米游社数据快照, 不请求米游社接口
+OFFLINE = os.getenv('GSMAP_OFFLINE', '0') != '0'
+# 后台刷新米游社数据快照的间隔(秒), 为 0 时不刷新
+SNAPSHOT_INTERVAL = float(os.getenv('GSMAP_SNAPSHOT_INTERVAL', 3600))
+
+# 内存中最多缓存的资源点标记图数量
+SPRITE_CACHE_SIZE = int(os.getenv('GSMAP_SPRITE_CACHE_SIZE', 512))
+
+# 图标下载失败时的最大重试次数与退避基数(秒)
+ICON_RETRIES = int(os.getenv('GSMAP_ICON_RETRIES', 3))
+ICON_RETRY_BACKOFF = float(os.getenv('GSMAP_ICON_RETRY_BACKOFF', 0.5))
+# 预下载图标时的最大并发数
+ICON_CONCURRENCY = int(os.getenv('GSMAP_ICON_CONCURRENCY', 8))
+
+# 渲染执行器: process(多进程) 或 thread(线程池)
+RENDER_EXECUTOR = os.getenv('GSMAP_RENDER_EXECUTOR', 'process')
+# 渲染并发数, 默认为 CPU 核心数
+RENDER_WORKERS = int(os.getenv('GSMAP_RENDER_WORKERS', 0)) or os.cpu_count()
+
+# 初始化时并行拼接地图的进程数, 默认为 CPU 核心数
+BUILD_WORKERS = int(os.getenv('GSMAP_BUILD_WORKERS', 0)) or os.cpu_count()
+# 初始化时预绘制资源图的并发数
+PRERENDER_CONCURRENCY = int(
+    os.getenv('GSMAP_PRERENDER_CONCURRENCY', 0)
+) or RENDER_WORKERS
+
+# 拼接与写入原始地图时每次处理的像素行数, 决定初始化时的内存峰值
+BAND_HEIGHT = int(os.getenv('GSMAP_BAND_HEIGHT', 2048))
+# 构建时生成的缩小地图层级数, 依次为 1/2, 1/4, 1/8 ..., 为 0 时不生成
+PYRAMID_LEVELS = int(os.getenv('GSMAP_PYRAMID_LEVELS', 3))
+# 是否同时保存 PNG 格式的地图
+SAVE_MAP_PNG = os.getenv('GSMAP_SAVE_MAP_PNG', '1') != '0'
+
+# 检查地图版本更新的间隔(秒), 为 0 时不检查
+MAP_REFRESH_INTERVAL = float(os.getenv('GSMAP_MAP_REFRESH_INTERVAL', 21600))
+
+# 资源图缓存占用的最大磁盘空间(MB)与淘汰策略(lru/lfu)
+RENDER_CACHE_SIZE = int(os.getenv('GSMAP_RENDER_CACHE_SIZE', 2048))
+RENDER_CACHE_POLICY = os.getenv('GSMAP_RENDER_CACHE_POLICY', 'lru')
+# 资源图缓存索引写入磁盘的间隔(秒)
+RENDER_CACHE_FLUSH_INTERVAL = float(
+    os.getenv('GSMAP_RENDER_CACHE_FLUSH_INTERVAL', 30)
+)
+# 内存中保留的热门资源图大小上限(MB), 以及响应的 Cache-Control 有效期(秒)
+HOT_CACHE_SIZE = int(os.getenv('GSMAP_HOT_CACHE_SIZE', 256))
+RENDER_MAX_AGE = int(os.getenv('GSMAP_RENDER_MAX_AGE', 3600))
+
+# is_cluster 请求使用的聚类算法: kmeans, grid 或 dbscan
+CLUSTER_ALGORITHM = os.getenv('GSMAP_CLUSTER_ALGORITHM', 'kmeans')
+
+# 上游请求: 每个主机的最大连接数, 连接与读取超时(秒), 是否启用 HTTP/2(需安装 h2)
+HTTP_MAX_CONNECTIONS = int(os.getenv('GSMAP_HTTP_MAX_CONNECTIONS', 16))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('GSMAP_HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.getenv('GSMAP_HTTP_READ_TIMEOUT', 30))
+HTTP2 = os.getenv('GSMAP_HTTP2', '0') != '0'
+# 米游社接口: 失败时的最大请求次数与单次调用的总时间预算(秒), 连续失败多少次后熔断及熔断时长(秒)
+API_RETRIES = int(os.getenv('GSMAP_API_RETRIES', 4))
+API_DEADLINE = float(os.getenv('GSMAP_API_DEADLINE', 30))
+API_BREAKER_THRESHOLD = int(os.getenv('GSMAP_API_BREAKER_THRESHOLD', 5))
+API_BREAKER_TIMEOUT = float(os.getenv('GSMAP_API_BREAKER_TIMEOUT', 30))
+
+# 下载地图切片的最大并发数(根据延迟与 429 自动调整), 以及失败时的重试次数与退避基数(秒)
+TILE_CONCURRENCY = int(os.getenv('GSMAP_TILE_CONCURRENCY', 16))
+TILE_RETRIES = int(os.getenv('GSMAP_TILE_RETRIES', 5))
+TILE_RETRY_BACKOFF = float(os.getenv('GSMAP_TILE_RETRY_BACKOFF', 0.5))
@@ -1,11 +1,25 @@
+import json
+import time
+import random
+import asyncio
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Tuple, Optional, Sequence
+
 import aiofiles
-import aiohttp
-from httpx import AsyncClient
+import numpy as np
 from PIL import Image
-import asyncio
+
 from .logger import logger
-from pathlib import Path
+from .config import (
+    BAND_HEIGHT,
+    TILE_RETRIES,
+    TILE_CONCURRENCY,
+    TILE_RETRY_BACKOFF,
+)
+from .raw_map import raw_map_writer
 from .GenshinMap.genshinmap.models import DetailV2
+from .GenshinMap.genshinmap.transport import transport
 
 slice_path = Path(__file__).parent / 'slice_data'
 slice_path.mkdir(parents=True, exist_ok=True)
@@ -20,120 +34,307 @@ world = {
     36: '/36/bb19ccbed47e8d9dca730050219d0b90',
 }
 
-_map_id = 0
-x, y = 0, 0
+
+def get_map_version(map_id: int) -> Optional[str]:
+    if map_id not in world:
+        return None
+    return world[map_id].rsplit('/', 1)[-1]
+
+
+def get_tile_dir(map_id: int, version: Optional[str] = None) -> Path:
+    # 切片按地图版本分目录保存, 地图更新后不会混用旧切片
+    return slice_path / str(map_id) / (version or get_map_version(map_id))
+
+
+def move_legacy_tiles(map_id: int, version: Optional[str] = None):
+    '''
+    旧版本直接保存在 slice_data 下的切片移入当前版本的目录
+
+    移入的切片没有下载记录, 下载时由 TileManifest 校验后采用
+    '''
+    legacy = list(slice_path.glob(f'{map_id}_*_*.webp'))
+    version = version or get_map_version(map_id)
+    if not legacy or version is None:
+        return
+    tile_dir = get_tile_dir(map_id, version)
+    tile_dir.mkdir(parents=True, exist_ok=True)
+    for tile in legacy:
+        target = tile_dir / tile.name.split('_', 1)[1]
+        if target.exists():
+            tile.unlink()
+        else:
+            tile.replace(target)
+    logger.info(f'已将地图 {map_id} 的 {len(legacy)} 张旧格式切片移入 {version}')
+
+
+def remove_old_tiles(map_id: int, version: str):
+    # 地图更新后仍未移入的旧格式切片属于旧版本地图, 不再使用
+    legacy = list(slice_path.glob(f'{map_id}_*_*.webp'))
+    for tile in legacy:
+        tile.unlink()
+    if legacy:
+        logger.info(f'已清理地图 {map_id} 的 {len(legacy)} 张旧格式切片')
+    for tile_dir in (slice_path / str(map_id)).glob('*'):
+        if tile_dir.is_dir() and tile_dir.name != version:
+            for tile in tile_dir.iterdir():
+                tile.unlink()
+            tile_dir.rmdir()
+            logger.info(f'已清理地图 {map_id} 的旧版本切片 {tile_dir.name}')
 
 
 async def update_world():
-    async with AsyncClient() as client:
-        resp = await client.get(
+    # 请求失败时继续使用原有的地图列表
+    try:
+        resp = await transport.get(
             'https://api-takumi.mihoyo.com/common/map_user/ys_obc/v1/map/list?map_id=2&app_sn=ys_obc&lang=zh-cn'
         )
         if resp.status_code != 200:
             logger.warning(f'更新地图列表失败, 状态码: {resp.status_code}')
             return
         data = resp.json()['data']['all_map_list']
-        for item in data:
-            if item['detail_v2']['map_version']:
-                world[item['id']] = f'/{item["id"]}/{item["detail_v2"]["map_version"]}'
+    except Exception as e:
+        logger.warning(f'更新地图列表失败: {e}')
+        return
+    for item in data:
+        if item['detail_v2']['map_version']:
+            world[item['id']] = f'/{item["id"]}/{item["detail_v2"]["map_version"]}'
 
     logger.info(f'更新地图列表成功, 地图数量: {len(world)}')
     logger.info(world)
 
 
-async def download_file(url, save_path):
-    async with aiohttp.ClientSession() as session:
-        logger.info(f'开始下载: {url}')
-        async with session.get(str(url)) as response:
-            if response.status == 200:
-                async with aiofiles.open(save_path, "wb") as f:
-                    await f.write(await response.read())
+async def download_file(url, save_path: Path):
+    logger.info(f'开始下载: {url}')
+    resp = await transport.get(str(url))
+    resp.raise_for_status()
+    data = resp.content
+    # 先写入临时文件再重命名, 避免留下不完整的文件
+    tmp_path = save_path.with_name(f'{save_path.name}.tmp')
+    async with aiofiles.open(tmp_path, "wb") as f:
+        await f.write(data)
+    tmp_path.replace(save_path)
+
+
+class TileError(Exception):
+    '''切片多次下载失败'''
+
+
+class AdaptiveLimiter:
+    '''
+    根据响应自动调整的并发上限
+
+    响应较快时逐步增加并发, 变慢时减少, 收到 429 时减半
+    '''
+
+    def __init__(
+        self,
+        maximum: int = TILE_CONCURRENCY,
+        minimum: int = 1,
+        slow_latency: float = 2.0,
+    ):
+        self.maximum = max(maximum, minimum)
+        self.minimum = minimum
+        self.limit = max(self.maximum // 2, minimum)
+        self.slow_latency = slow_latency
+        self.active = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self, latency: float, throttled: bool = False):
+        async with self._condition:
+            self.active -= 1
+            if throttled:
+                self.limit = max(self.limit // 2, self.minimum)
+                self._successes = 0
+                logger.info(f'[切片] 请求过于频繁, 并发数降为 {self.limit}')
+            elif latency > self.slow_latency:
+                self.limit = max(self.limit - 1, self.minimum)
+                self._successes = 0
+            else:
+                # 每完成一轮并发数的请求后增加一个并发
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self._successes = 0
+                    self.limit = min(self.limit + 1, self.maximum)
+            self._condition.notify_all()
+
+
+class TileManifest:
+    '''
+    记录已完成的切片, 中断后重新下载时跳过
+
+    值为文件大小, 上游不存在的切片记为 0
+    '''
+
+    def __init__(self, tile_dir: Path):
+        self.path = tile_dir / 'manifest.json'
+        self.tiles: Dict[str, int] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.tiles = json.load(f)
+
+    def is_done(self, name: str) -> bool:
+        path = self.path.parent / name
+        size = self.tiles.get(name)
+        if size is None:
+            return self._adopt(path)
+        # 文件被删除或改动过时重新下载
+        return size == 0 or (path.exists() and path.stat().st_size == size)
+
+    def _adopt(self, path: Path) -> bool:
+        # 旧格式移入的切片与中断前未记录的切片, 校验通过后直接采用
+        if not path.exists():
+            return False
+        try:
+            validate_tile(path.read_bytes())
+        except Exception:
+            return False
+        self.add(path.name, path.stat().st_size)
+        return True
+
+    def add(self, name: str, size: int):
+        self.tiles[name] = size
+
+    def save(self):
+        tmp_path = self.path.with_name(f'{self.path.name}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.tiles, f)
+        tmp_path.replace(self.path)
+
+
+def validate_tile(data: bytes):
+    # 解析文件头, 确认是完整的 256x256 图片
+    with Image.open(BytesIO(data)) as img:
+        if img.size != (256, 256):
+            raise ValueError(f'切片尺寸错误: {img.size}')
 
 
 async def download_P0_img(
-    client: AsyncClient,
     map_id: int,
     i: int,
     j: int,
-):
-    logger.info(f'当前尝试请求:[{map_id}] | {i} {j}')
-    global x, y
+    limiter: AdaptiveLimiter,
+) -> int:
+    '''下载单个切片, 返回文件大小, 上游不存在时返回 0'''
+    url = BASE + world[map_id] + f'/{i}_{j}_P0.webp'
+    path = get_tile_dir(map_id) / f'{i}_{j}.webp'
+    for attempt in range(TILE_RETRIES):
+        await limiter.acquire()
+        start = time.monotonic()
+        throttled = False
+        try:
+            resp = await transport.get(
+                url,
+                headers={
+                    'Accept-Encoding': 'deflate',
+                    'Accept-Ranges': 'bytes',
+                },
+            )
+            throttled = resp.status_code == 429
+            if resp.status_code == 404:
+                return 0
+            resp.raise_for_status()
+            data = resp.content
+            validate_tile(data)
+        except Exception as e:
+            logger.warning(
+                f'切片 [{map_id}] {i}_{j} 下载失败 '
+                f'({attempt + 1}/{TILE_RETRIES}): {e}'
+            )
+        else:
+            # 先写入临时文件再重命名, 避免留下不完整的文件
+            tmp_path = path.with_name(f'{path.name}.tmp')
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                await f.write(data)
+            tmp_path.replace(path)
+            return len(data)
+        finally:
+            await limiter.release(time.monotonic() - start, throttled)
+        # 指数退避并加入随机抖动, 避免同时重试
+        await asyncio.sleep(
+            random.uniform(0, TILE_RETRY_BACKOFF * 2**attempt)
+        )
+    raise TileError(f'{map_id} {i}_{j}')
+
+
+async def download_P0_map(map_id: int, detail_v2: DetailV2):
+    # 左上角x, y區塊座標 (padding) — 可改為 0,0
+    x0, y0 = (val // 256 for val in detail_v2.padding)
+    # 右下角區塊座標 — 可改models.py裡的calculate_size()為t // 256
+    x1, y1 = detail_v2.calculate_size()
+
     if map_id not in world:
         logger.warning(f'地图 {map_id} 不存在！')
         return
+    tile_dir = get_tile_dir(map_id)
+    tile_dir.mkdir(parents=True, exist_ok=True)
+    manifest = TileManifest(tile_dir)
 
-    URL = BASE + world[map_id] + '/{}_P0.webp'
-    try:
-        resp = await client.get(
-            URL.format(f'{i}_{j}'),
-            headers={
-                'Accept-Encoding': 'deflate',
-                'Accept-Ranges': 'bytes',
-            },
-        )
-    except Exception as e:
-        logger.warning(f'请求失败, 可能不影响最终结果, 错误信息: {e}')
-        return
-
-    if resp.status_code != 200:
+    # 自動化下載區塊範圍
+    pending = [
+        (i, j)
+        for i in range(x0, x1)
+        for j in range(y0, y1)
+        if not manifest.is_done(f'{i}_{j}.webp')
+    ]
+    total = (x1 - x0) * (y1 - y0)
+    logger.info(f'地图 {map_id} 共 {total} 个切片, 需下载 {len(pending)} 个')
+    if not pending:
         return
 
-    if x < i:
-        x = i
-    if y < j:
-        y = j
+    limiter = AdaptiveLimiter()
+    queue: 'asyncio.Queue[Tuple[int, int]]' = asyncio.Queue()
+    for tile in pending:
+        queue.put_nowait(tile)
+    failed = []
 
-    async with aiofiles.open(slice_path / f'{map_id}_{i}_{j}.webp', 'wb') as f:
-        await f.write(resp.read())
-
-    logger.info(f'请求成功，文件 [{map_id}] | {i}_{j}.webp 已保存！')
+    async def _worker():
+        while not queue.empty():
+            i, j = queue.get_nowait()
+            try:
+                size = await download_P0_img(map_id, i, j, limiter)
+            except TileError:
+                failed.append((i, j))
+                continue
+            manifest.add(f'{i}_{j}.webp', size)
+            finished = len(manifest.tiles)
+            if finished % 100 == 0:
+                manifest.save()
+                logger.info(f'[切片] 地图 {map_id} 进度 {finished}/{total}')
 
+    # 工作协程数为并发上限, 实际并发由 limiter 控制
+    try:
+        await asyncio.gather(*[_worker() for _ in range(limiter.maximum)])
+    finally:
+        manifest.save()
+    if failed:
+        raise TileError(f'地图 {map_id} 有 {len(failed)} 个切片下载失败')
 
-async def make_P0_map(map_id: int, detail_v2: DetailV2) -> Image.Image:
-    global x, y, _map_id
 
-    # 左上角x, y區塊座標 (padding) — 可改為 0,0
+def stitch_P0_map(map_id: int, detail_v2: DetailV2) -> Image.Image:
     x0, y0 = (val // 256 for val in detail_v2.padding)
-    # 右下角區塊座標 — 可改models.py裡的calculate_size()為t // 256
     x1, y1 = detail_v2.calculate_size()
 
-    if map_id != _map_id:
-        _map_id = map_id
-        x, y = 0, 0
-
-    async with AsyncClient() as client:
-        TASK = []
-        # 自動化下載區塊範圍
-        for i in range(x0, x1):
-            for j in range(y0, y1):
-                if (slice_path / f'{map_id}_{i}_{j}.webp').exists():
-                    logger.info(f'文件 {map_id}_{i}_{j}.webp 已存在！跳过下载..')
-                    continue
-                else:
-                    TASK.append(download_P0_img(client, map_id, i, j))
-                if len(TASK) >= 15:
-                    await asyncio.gather(*TASK)
-                    await asyncio.sleep(0.5)
-                    TASK.clear()
-
-        if TASK:
-            await asyncio.gather(*TASK)
-            TASK.clear()
-
     if map_id == 2:
         ox, oy = 0, 0
     else:
         ox, oy = 0, 0
 
-    x = x1 - x0
-    y = y1 - y0
-    big_img = Image.new('RGBA', (x * 256 + ox, y * 256 + oy))
-    logger.info(f'【{map_id}切片下载完成, 开始合并】x: {x}, y: {y}')
+    w = x1 - x0
+    h = y1 - y0
+    big_img = Image.new('RGBA', (w * 256 + ox, h * 256 + oy))
+    logger.info(f'【{map_id}切片下载完成, 开始合并】x: {w}, y: {h}')
 
+    tile_dir = get_tile_dir(map_id)
     for i in range(x0, x1):
         for j in range(y0, y1):
             logger.info(f'合并: {i} {j}')
-            path = slice_path / f'{map_id}_{i}_{j}.webp'
+            path = tile_dir / f'{i}_{j}.webp'
             if path.exists():
                 img = Image.open(path)
             else:
@@ -142,3 +343,49 @@ async def make_P0_map(map_id: int, detail_v2: DetailV2) -> Image.Image:
             big_img.paste(img, (i * 256 + ox, j * 256 + oy), img)
 
     return big_img
+
+
+def stitch_P0_map_raw(
+    map_id: int,
+    detail_v2: DetailV2,
+    save_path: Path,
+    overlays: Sequence[Tuple[Image.Image, Tuple[int, int]]] = (),
+    band_height: int = BAND_HEIGHT,
+    version: Optional[str] = None,
+):
+    '''
+    按行带拼接地图并直接写入原始地图, 内存中只保留一个行带
+
+    overlays 为拼接后需要贴在地图上的图片及其左上角坐标
+    '''
+    x0, y0 = (val // 256 for val in detail_v2.padding)
+    x1, y1 = detail_v2.calculate_size()
+    width, height = (x1 - x0) * 256, (y1 - y0) * 256
+    # 行带高度取 256 的整数倍, 每行切片只属于一个行带
+    band_height = max(band_height // 256, 1) * 256
+    tile_dir = get_tile_dir(map_id, version)
+    logger.info(f'【{map_id}开始按行带合并】x: {x1 - x0}, y: {y1 - y0}')
+
+    with raw_map_writer(save_path, (width, height)) as array:
+        for top in range(0, height, band_height):
+            bottom = min(top + band_height, height)
+            band = Image.new('RGBA', (width, bottom - top))
+            for j in range(max(top // 256, y0), min(-(-bottom // 256), y1)):
+                for i in range(x0, x1):
+                    path = tile_dir / f'{i}_{j}.webp'
+                    # 缺失的切片保持透明, 无需创建空白图片
+                    if not path.exists():
+                        continue
+                    with Image.open(path) as img:
+                        img = img.convert('RGBA')
+                        band.paste(img, (i * 256, j * 256 - top), img)
+            for overlay, (x, y) in overlays:
+                if y < bottom and y + overlay.height > top:
+                    band.paste(overlay, (x, y - top), overlay)
+            array[top:bottom] = np.asarray(band)
+            logger.info(f'合并: {map_id} 行 {top}-{bottom}/{height}')
+
+
+async def make_P0_map(map_id: int, detail_v2: DetailV2) -> Image.Image:
+    await download_P0_map(map_id, detail_v2)
+    return stitch_P0_map(map_id, detail_v2)
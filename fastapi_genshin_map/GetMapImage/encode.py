@@ -0,0 +1,191 @@
+from io import BytesIO
+from typing import Dict, Tuple, Optional, NamedTuple
+
+from PIL import Image
+
+
+class ImageFormat(NamedTuple):
+    name: str
+    pil_format: str
+    media_type: str
+    extension: str
+    default_quality: Optional[int]
+
+
+# 服务端偏好顺序, Accept 中质量相同时靠前的优先
+FORMATS: Dict[str, ImageFormat] = {
+    'jpeg': ImageFormat('jpeg', 'JPEG', 'image/jpeg', 'jpg', 95),
+    'webp': ImageFormat('webp', 'WEBP', 'image/webp', 'webp', 90),
+    'png': ImageFormat('png', 'PNG', 'image/png', 'png', None),
+}
+ALIASES = {'jpg': 'jpeg'}
+DEFAULT_FORMAT = 'jpeg'
+MEDIA_TYPES = {f.extension: f.media_type for f in FORMATS.values()}
+
+# 按大小限制搜索质量时的范围
+MIN_QUALITY = 20
+MAX_QUALITY = 95
+
+# 每组参数对应一个缓存文件, 请求的 quality 与 max_bytes 向下取到以下档位,
+# 避免任意取值都重新绘制
+QUALITY_STEPS = (30, 50, 70, 80, 90, 95)
+MAX_BYTES_STEPS = tuple(32 * 1024 * 2**i for i in range(11))  # 32KB - 32MB
+
+
+class EncodeOptions(NamedTuple):
+    '''
+    资源图的编码参数
+
+    quality 与 max_bytes 最多指定一个, 都不指定时使用格式的默认质量;
+    指定 max_bytes 时搜索不超过该大小的最高质量
+    '''
+
+    format: str = DEFAULT_FORMAT
+    quality: Optional[int] = None
+    max_bytes: Optional[int] = None
+
+    @property
+    def image_format(self) -> ImageFormat:
+        return FORMATS[self.format]
+
+    @property
+    def suffix(self) -> str:
+        '''缓存文件名的后缀, 默认参数与原有的 .jpg 文件名一致'''
+        name = ''
+        if self.quality is not None:
+            name += f'_q{self.quality}'
+        if self.max_bytes is not None:
+            name += f'_b{self.max_bytes}'
+        return f'{name}.{self.image_format.extension}'
+
+
+DEFAULT_OPTIONS = EncodeOptions()
+
+
+def parse_accept(accept: str) -> Dict[str, float]:
+    '''解析 Accept 请求头, 返回 媒体类型 -> q 值'''
+    ranges = {}
+    for item in accept.split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        if not media_type:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges[media_type.lower()] = q
+    return ranges
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    '''
+    根据 Accept 请求头选择输出格式
+
+    明确列出的类型优先于 image/* 与 */*, 没有可接受的格式时使用 JPEG
+    '''
+    if not accept:
+        return DEFAULT_FORMAT
+    ranges = parse_accept(accept)
+    best: Tuple[float, int] = (0.0, -1)
+    result = DEFAULT_FORMAT
+    for name, image_format in FORMATS.items():
+        # (q 值, 具体程度), 更具体的类型覆盖通配符的 q 值
+        rank = None
+        for specificity, media_range in enumerate(
+            ('*/*', 'image/*', image_format.media_type)
+        ):
+            if media_range in ranges:
+                rank = (ranges[media_range], specificity)
+        if rank is not None and rank[0] > 0 and rank > best:
+            best, result = rank, name
+    return result
+
+
+def snap(value: int, steps: Tuple[int, ...]) -> int:
+    '''取不超过 value 的最大档位, 小于最小档位时取最小档位'''
+    return max((step for step in steps if step <= value), default=steps[0])
+
+
+def resolve_options(
+    accept: Optional[str],
+    format: Optional[str] = None,
+    quality: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> EncodeOptions:
+    '''
+    根据请求参数确定编码参数, 参数无效时抛出 ValueError
+
+    未指定 format 时根据 Accept 请求头协商, quality 与 max_bytes 取到档位
+    '''
+    if format:
+        format = ALIASES.get(format.lower(), format.lower())
+        if format not in FORMATS:
+            raise ValueError(f'不支持的图片格式 {format}, 可选 jpeg、webp、png')
+    else:
+        format = negotiate_format(accept)
+    if quality is not None and max_bytes is not None:
+        raise ValueError('quality 与 max_bytes 只能指定一个')
+    if quality is not None:
+        if not 1 <= quality <= 100:
+            raise ValueError('quality 应在 1 到 100 之间')
+        if format == 'png':
+            # PNG 为无损格式, 质量参数无效
+            quality = None
+    if max_bytes is not None and max_bytes <= 0:
+        raise ValueError('max_bytes 应大于 0')
+
+    if quality is not None:
+        quality = snap(quality, QUALITY_STEPS)
+        # 与默认质量相同时使用默认的缓存文件
+        if quality == FORMATS[format].default_quality:
+            quality = None
+    if max_bytes is not None:
+        # 超过最大档位时与不限制大小相同
+        if max_bytes >= MAX_BYTES_STEPS[-1]:
+            max_bytes = None
+        else:
+            max_bytes = snap(max_bytes, MAX_BYTES_STEPS)
+    return EncodeOptions(format, quality, max_bytes)
+
+
+def _save(image: Image.Image, image_format: ImageFormat, **params) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, image_format.pil_format, **params)
+    return buffer.getvalue()
+
+
+def encode_image(image: Image.Image, options: EncodeOptions) -> bytes:
+    '''
+    按编码参数编码图片, 在执行器中运行
+
+    指定 max_bytes 时二分搜索不超过该大小的最高质量, PNG 则在超出时转为
+    256 色; 最低质量仍超出时返回最小的结果
+    '''
+    image_format = options.image_format
+    if image_format.default_quality is None:
+        data = _save(image, image_format, optimize=True)
+        if options.max_bytes is not None and len(data) > options.max_bytes:
+            data = _save(image.quantize(256), image_format, optimize=True)
+        return data
+
+    if options.max_bytes is None:
+        quality = options.quality or image_format.default_quality
+        return _save(image, image_format, quality=quality)
+
+    low, high = MIN_QUALITY, MAX_QUALITY
+    best: Optional[bytes] = None
+    smallest: Optional[bytes] = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _save(image, image_format, quality=quality)
+        if len(data) <= options.max_bytes:
+            best, low = data, quality + 1
+        else:
+            high = quality - 1
+            if smallest is None or len(data) < len(smallest):
+                smallest = data
+    return best or smallest or b''
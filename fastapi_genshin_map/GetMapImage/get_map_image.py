@@ -1,27 +1,74 @@
 import random
+import asyncio
 from pathlib import Path
-from typing import Optional, Union
+from typing import Set, List, Tuple, Union, Optional, Coroutine
 
-import yaml
-from fastapi import APIRouter
-from fastapi.responses import FileResponse
+import numpy as np
+from fastapi import Request, APIRouter
+from fastapi.responses import Response
 from PIL import Image
 
-from .GenshinMap.genshinmap import img, models, request, utils
-from .logger import logger
-from .download import download_file, make_P0_map, update_world
+from .GenshinMap.genshinmap import retry, models
+from .GenshinMap.genshinmap.store import PointStore
+from .GenshinMap.genshinmap.utils import Box, bbox_array, crop_box_bbox
+from .GenshinMap.genshinmap.cluster import cluster_indices
+from .GenshinMap.genshinmap.transport import transport
+from .logger import logger, init_rollbar
+from .api_cache import labels_cache, points_cache, get_resource_index
+from .alias_index import alias_index
+from .label_index import LabelEntry
+from .render_cache import RESOURCE_PATH, RenderEntry, render_cache
+from .download import get_map_version
+from .icon import icon_store
+from .singleflight import SingleFlight
+from .encode import (
+    MEDIA_TYPES,
+    EncodeOptions,
+    DEFAULT_OPTIONS,
+    resolve_options,
+)
+from .snapshot import set_offline, snapshot_manager
+from .config import (
+    HTTP2,
+    OFFLINE,
+    API_RETRIES,
+    API_DEADLINE,
+    RENDER_MAX_AGE,
+    CLUSTER_ALGORITHM,
+    HTTP_READ_TIMEOUT,
+    SNAPSHOT_INTERVAL,
+    API_BREAKER_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    MAP_REFRESH_INTERVAL,
+    API_BREAKER_THRESHOLD,
+    PRERENDER_CONCURRENCY,
+    RENDER_CACHE_FLUSH_INTERVAL,
+)
+from .raw_map import (
+    has_pyramid,
+    load_raw_map,
+    build_pyramid,
+    convert_png_to_raw,
+)
+from .build import (
+    MAP,
+    build_maps,
+    refresh_maps,
+    load_manifest,
+    update_manifest,
+)
+from .render import (
+    run_render,
+    make_render_job,
+    downscale_factor,
+    start_executor,
+    shutdown_executor,
+)
 
 Image.MAX_IMAGE_PIXELS = 603120000
 router = APIRouter(prefix='/get_map')
-TEXT_PATH = Path(__file__).parent / 'texture2d'
-mark_quest = Image.open(TEXT_PATH / 'mark_quest.png').resize((32, 32))
-MAP = Path(__file__).parent / 'map_data'
-RESOURCE_PATH = Path(__file__).parent / 'resource_data'
-ICON_PATH = Path(__file__).parent / 'icon_data'
-
-_path = Path(__file__).parent / 'map.yaml'
-with open(_path, 'r', encoding='utf-8') as ymlfile:
-    resource_aliases = yaml.load(ymlfile, Loader=yaml.SafeLoader)
+render_flight: SingleFlight[Path, Optional[RenderEntry]] = SingleFlight()
 
 MAP_ID_DICT = {
     '2': models.MapID.teyvat,  # 提瓦特
@@ -32,102 +79,181 @@ MAP_ID_DICT = {
     # MapID.golden_apple_archipelago,  # 金苹果群岛
 }
 
-if not ICON_PATH.exists():
-    ICON_PATH.mkdir(exist_ok=True)
+
+_background_tasks: Set['asyncio.Task'] = set()
+
+
+def _on_task_done(task: 'asyncio.Task'):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f'后台任务失败: {task.exception()}')
+
+
+def run_in_background(coro: Coroutine):
+    # 保留任务引用, 避免后台任务被回收
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_task_done)
+
+
+@router.on_event('shutdown')
+async def close_genshin_map():
+    for task in list(_background_tasks):
+        task.cancel()
+    shutdown_executor()
+    render_cache.save()
+    await transport.aclose()
 
 
 # 校验地图文件是否下载
 def check_map_file():
     for map_id in MAP_ID_DICT.values():
         map_path = MAP / f'{map_id.name}.png'
-        if not map_path.exists():
-            logger.info(f'地图文件 {map_path} 不存在')
-            return False
+        raw_path = MAP / f'{map_id.name}.npy'
+        if not raw_path.exists():
+            if not map_path.exists():
+                logger.info(f'地图文件 {map_path} 不存在')
+                return False
+            convert_png_to_raw(map_path, raw_path)
+        # 旧版本构建的地图没有缩小的层级
+        if not has_pyramid(raw_path):
+            logger.info(f'正在生成 {raw_path.name} 的缩小地图...')
+            build_pyramid(raw_path)
     return True
 
 
-@router.on_event('startup')
-async def create_genshin_map():
-    if check_map_file():
-        logger.info('****************** 开始地图API服务 *****************')
-        return
-    logger.info('****************** 地图API服务进行初始化 *****************')
-    mark_god_pic = Image.open(TEXT_PATH / 'mark_god.png')
-    mark_trans_pic = Image.open(TEXT_PATH / 'mark_trans.png')
-
-    # 自动更新地图
-    await update_world()
-    import asyncio
-
-    await asyncio.sleep(2)
-
-    for map_id in models.MapID:
-        maps = await request.get_maps(map_id)
-        points = await request.get_points(map_id)
-        # 获取七天神像锚点
-        mark_god = utils.get_points_by_id(2, points)
-        # 获取传送锚点
-        mark_trans = utils.get_points_by_id(3, points)
-        # 转换两个锚点为标准坐标
-        mark_god_converted = utils.convert_pos(
-            mark_god,
-            maps.get_detail.origin,
-        )
-        mark_trans_converted = utils.convert_pos(
-            mark_trans,
-            maps.get_detail.origin,
-        )
-        maps = await request.get_maps(map_id)
-        # map_img = await utils.make_map(maps.detail)
+async def prefetch_icons():
+    icons = []
+    for map_id in MAP_ID_DICT.values():
+        icons.extend((await labels_cache.get(map_id)).iter_icons())
+    await icon_store.prefetch(icons)
+
+
+async def prerender_labels(map_ids: List[models.MapID]):
+    # 预绘制全部资源点, 并发数有限, 完成后记录到构建清单
+    semaphore = asyncio.Semaphore(PRERENDER_CONCURRENCY)
+    for map_id in map_ids:
+        trees = (await labels_cache.get(map_id)).trees
+        names = [label.name for tree in trees for label in tree.children]
+        finished = 0
+
+        async def _render(name: str):
+            nonlocal finished
+            async with semaphore:
+                try:
+                    await get_map_response('PRE-START', name, map_id, False)
+                except Exception as e:
+                    logger.warning(f'[预绘制] {map_id.name} {name} 失败: {e}')
+            finished += 1
+            if finished % 50 == 0 or finished == len(names):
+                logger.info(
+                    f'[预绘制] {map_id.name} 进度 {finished}/{len(names)}'
+                )
 
-        # 自动制作地图
-        map_img = await make_P0_map(maps.id, maps.get_detail)
+        await asyncio.gather(*[_render(name) for name in names])
+        update_manifest(map_id, prerendered=True)
+
+
+def invalidate_renders(map_id: models.MapID):
+    render_cache.invalidate(f'{map_id.name}_')
+    logger.info(f'[更新] 已清除地图 {map_id.name} 的资源图缓存')
+
+
+async def flush_loop():
+    # 定期在后台写入资源图缓存索引, 绘制时不再同步写盘
+    while True:
+        await asyncio.sleep(RENDER_CACHE_FLUSH_INTERVAL)
+        try:
+            await render_cache.flush()
+        except Exception as e:
+            logger.warning(f'[缓存] 写入资源图缓存索引失败: {e}')
+
+
+async def refresh_loop(map_ids: List[models.MapID]):
+    # 定期检查地图版本, 只重建并重新绘制有更新的地图
+    while True:
+        await asyncio.sleep(MAP_REFRESH_INTERVAL)
+        try:
+            changed = await refresh_maps(map_ids)
+        except Exception as e:
+            logger.warning(f'[更新] 检查地图更新失败: {e}')
+            continue
+        for map_id in changed:
+            invalidate_renders(map_id)
+        if changed:
+            await prerender_labels(changed)
+
+
+async def snapshot_loop(map_ids: List[models.MapID]):
+    # 没有快照时立即生成, 之后定期刷新
+    snapshot = snapshot_manager.current
+    delay = 0 if snapshot is None else SNAPSHOT_INTERVAL - snapshot.age
+    while True:
+        await asyncio.sleep(max(delay, 0))
+        delay = SNAPSHOT_INTERVAL
+        try:
+            await snapshot_manager.refresh(map_ids)
+        except Exception as e:
+            logger.warning(f'[快照] 更新快照失败: {e}')
 
-        for mark_god_point in mark_god_converted:
-            map_img.paste(
-                mark_god_pic,
-                (int(mark_god_point.x) - 32, int(mark_god_point.y) - 64),
-                mark_god_pic,
-            )
-        for mark_trans_point in mark_trans_converted:
-            map_img.paste(
-                mark_trans_pic,
-                (int(mark_trans_point.x) - 32, int(mark_trans_point.y) - 64),
-                mark_trans_pic,
-            )
-        if not MAP.exists():
-            MAP.mkdir()
-        map_img.save(MAP / f'{map_id.name}.png')
-        logger.info('****************** 开始绘制 *****************')
-        trees = await request.get_labels(map_id)
-        '''
-        for tree in trees:
-            for label in tree.children:
-                await get_map_response(
-                    'PRE-START',
-                    label.name,
-                    map_id,
-                    False,
-                )
-        '''
-        # 改成并发
-        import asyncio
-
-        tasks = []
-        for tree in trees:
-            for label in tree.children:
-                tasks.append(
-                    get_map_response(
-                        'PRE-START',
-                        label.name,
-                        map_id,
-                        False,
-                    )
-                )
-            if len(tasks) > 10:
-                await asyncio.gather(*tasks)
-                tasks = []
-        await asyncio.gather(*tasks)
+
+@router.on_event('startup')
+async def create_genshin_map():
+    # 导入时不做初始化, 在服务启动时加载别名、启动渲染执行器并初始化 Rollbar
+    init_rollbar()
+    transport.configure(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        http2=HTTP2,
+    )
+    retry.policy.configure(max_attempts=API_RETRIES, deadline=API_DEADLINE)
+    retry.breaker_options.update(
+        failure_threshold=API_BREAKER_THRESHOLD,
+        reset_timeout=API_BREAKER_TIMEOUT,
+    )
+    alias_index.compile()
+    start_executor()
+
+    # 加载资源图缓存索引
+    render_cache.load()
+    run_in_background(flush_loop())
+
+    # 读取米游社数据快照, 启动时无需等待米游社接口
+    map_ids = list(MAP_ID_DICT.values())
+    snapshot = snapshot_manager.load()
+    set_offline(OFFLINE)
+    if OFFLINE:
+        if snapshot is None:
+            logger.error('[快照] 离线模式下没有可用的快照')
+    elif SNAPSHOT_INTERVAL > 0:
+        run_in_background(snapshot_loop(map_ids))
+
+    # 加载图标图集, 并在后台补全缺失的图标
+    icon_store.load_atlas()
+    if not OFFLINE:
+        run_in_background(prefetch_icons())
+
+    # 旧版本地图的格式转换与缩小层级耗时较长, 在线程池中进行
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, check_map_file):
+        if OFFLINE:
+            logger.error('离线模式下无法下载地图, 缺少地图文件')
+        else:
+            logger.info('****************** 地图API服务进行初始化 *****************')
+            await build_maps(map_ids)
+
+    # 中断过的预绘制在后台继续
+    manifest = load_manifest()
+    pending = [
+        map_id
+        for map_id in map_ids
+        if not manifest.get(map_id.name, {}).get('prerendered')
+    ]
+    if pending:
+        run_in_background(prerender_labels(pending))
+    if MAP_REFRESH_INTERVAL > 0 and not OFFLINE:
+        run_in_background(refresh_loop(map_ids))
     logger.info('****************** 开始地图API服务 *****************')
 
 
@@ -136,192 +262,233 @@ async def get_map_response(
     resource_name: str,
     map_id: models.MapID,
     is_cluster: bool = False,
-) -> Optional[Path]:
-    # 寻找主地图的缓存
-    map_path = MAP / f'{map_id.name}.png'
-    if '/' in resource_name:
-        resource_name = resource_name.replace('/', '_')
-
-    # 寻找保存点
-    if not RESOURCE_PATH.exists():
-        RESOURCE_PATH.mkdir()
-    if is_cluster:
-        save_path = RESOURCE_PATH / f'{map_id.name}_{resource_name}_KMEANS.jpg'
-    else:
-        save_path = RESOURCE_PATH / f'{map_id.name}_{resource_name}.jpg'
-
-    # 如果存在缓存,直接回复
-    if save_path.exists():
-        logger.info(f'{prefix} [查询成功]：发送缓存 [{save_path.name}]！')
-        return save_path
-
-    maps = await request.get_maps(map_id)
-    trees = await request.get_labels(map_id)
-
+    options: EncodeOptions = DEFAULT_OPTIONS,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+) -> Optional[RenderEntry]:
     # 请求资源ID
-    resource_id = 0
-    for tree in trees:
-        for label in tree.children:
-            if resource_name == label.name:
-                resource_id = label.id
-                resource_name = label.name
-                icon = label.icon
-                break
-        else:
-            if resource_name == tree.name:
-                resource_id = tree.id
-                resource_name = tree.name
-                icon = tree.icon
-                break
-
-    if resource_id == 0:
+    label_index = await labels_cache.get(map_id)
+    entry = label_index.find(resource_name)
+    if entry is None:
         return
 
-    # 请求坐标点
-    points = await request.get_points(map_id)
-    transmittable = utils.get_points_by_id(resource_id, points)
+    # 请求坐标点, 坐标已转换为以左上角为原点
+    points = await points_cache.get(map_id)
+    fingerprint = points.fingerprint(entry.id)
 
-    # 转换坐标
-    transmittable_converted = utils.convert_pos(
-        transmittable,
-        maps.get_detail.origin,
+    # 寻找保存点, 文件名包含编码参数
+    resource_name = entry.name.replace('/', '_')
+    name = f'{map_id.name}_{resource_name}'
+    if is_cluster:
+        name += f'_{CLUSTER_ALGORITHM.upper()}'
+    # 限制大小时按实际缩小倍数命名, 不缩小时与原图共用缓存
+    location = None
+    factor = 1
+    if max_width or max_height:
+        location = locate_resource(points, entry.id, map_id, is_cluster)
+        if location is None:
+            return
+        factor = downscale_factor(location[1], max_width, max_height)
+        if factor > 1:
+            name += f'_down{factor}'
+    save_path = RESOURCE_PATH / f'{name}{options.suffix}'
+
+    # 如果存在缓存且资源点未变化,直接回复
+    cached = render_cache.lookup(save_path.name, fingerprint)
+    if cached is not None:
+        logger.info(f'{prefix} [查询成功]：发送缓存 [{save_path.name}]！')
+        return cached
+
+    # 同一资源的并发请求只绘制一次, 其余请求等待结果
+    return await render_flight.do(
+        save_path,
+        lambda: draw_resource(
+            prefix,
+            entry,
+            points,
+            map_id,
+            is_cluster,
+            save_path,
+            fingerprint,
+            options,
+            location,
+            factor,
+        ),
     )
 
+
+def locate_resource(
+    points: PointStore,
+    resource_id: int,
+    map_id: models.MapID,
+    is_cluster: bool,
+) -> Optional[Tuple[Optional[np.ndarray], Box]]:
+    '''资源点的裁切范围, 聚类时同时返回最密集一组资源点的下标'''
+    raw_path = MAP / f'{map_id.name}.npy'
+
     # 进行最密点获取
     if is_cluster:
-        group_point = img.k_means_points(transmittable_converted)
+        columns = points.get(resource_id)
+        indices = cluster_indices(
+            columns.x, columns.y, algorithm=CLUSTER_ALGORITHM
+        )
+        if not indices:
+            return None
+        index = indices[0]
+        bbox = bbox_array(columns.x[index], columns.y[index])
+        offset = 0
     else:
-        # 如果资源点不存在,返回错误
-        if len(transmittable_converted) == 0:
-            return
-        else:
-            # 计算极限坐标
-            up = 20000
-            down = 0
-            left = 20000
-            right = 0
-            for point in transmittable_converted:
-                if point.x >= right:
-                    right = point.x
-                if point.x <= left:
-                    left = point.x
-                if point.y >= down:
-                    down = point.y
-                if point.y <= up:
-                    up = point.y
-            offset = 100
-            group_point = [
-                [
-                    models.XYPoint(left - offset, up - offset),
-                    models.XYPoint(right + offset, down + offset),
-                    transmittable_converted,
-                ]
-            ]
+        # 全部资源点的范围在构建 PointStore 时已经算好
+        index = None
+        bbox = points.bbox(resource_id)
+        offset = 100
+
+    # 裁切范围, 范围过小时四周扩大, 且不超出地图
+    size = load_raw_map(raw_path).size if raw_path.exists() else None
+    crop_box = crop_box_bbox(bbox, offset, 500, 400, size)
+    if crop_box is None:
+        return None
+    return index, crop_box
+
+
+async def draw_resource(
+    prefix: str,
+    entry: LabelEntry,
+    points: PointStore,
+    map_id: models.MapID,
+    is_cluster: bool,
+    save_path: Path,
+    fingerprint: str,
+    options: EncodeOptions,
+    location: Optional[Tuple[Optional[np.ndarray], Box]] = None,
+    factor: int = 1,
+) -> Optional[RenderEntry]:
+    # 寻找主地图的缓存
+    map_path = MAP / f'{map_id.name}.png'
+    raw_path = MAP / f'{map_id.name}.npy'
+
+    resource_id = entry.id
+    resource_name = entry.name.replace('/', '_')
+    icon = entry.icon
+    if location is None:
+        location = locate_resource(points, resource_id, map_id, is_cluster)
+    # 如果资源点不存在,返回错误
+    if location is None:
+        return
+    index, crop_box = location
+    columns = points.get(resource_id)
+    if index is not None:
+        columns = columns.take(index)
 
     logger.info(f'{prefix} [新增缓存]：开始绘制 {save_path.name}...')
-    # 打开主地图
-    genshin_map = Image.open(map_path)
-
-    # 计算裁切点
-    lt_point = group_point[0][0]
-    rb_point = group_point[0][1]
-
-    # 增加裁切长宽
-    x = rb_point[0] - lt_point[0]
-    y = rb_point[1] - lt_point[1]
-    if x < 500 or y < 500:
-        lt_point = models.XYPoint(lt_point.x - 400, lt_point.y - 400)
-        rb_point = models.XYPoint(rb_point.x + 400, rb_point.y + 400)
-
-    # 开始裁切
-    genshin_map = genshin_map.crop(
-        (int(lt_point.x), int(lt_point.y), int(rb_point.x), int(rb_point.y))
+
+    # 资源图标只需读取一次
+    icon_pic = await icon_store.get(resource_name, icon)
+
+    # 裁切与绘制在执行器中进行, 不阻塞事件循环
+    job = make_render_job(
+        map_path,
+        raw_path,
+        crop_box,
+        columns,
+        resource_name,
+        icon_pic,
+        save_path,
+        options,
+        factor,
     )
+    await run_render(job)
+    version = get_map_version(map_id.value)
+    entry = render_cache.add(save_path.name, fingerprint, version)
+    logger.info(f'{prefix} [查询成功]：新增缓存 [{save_path.name}]！')
+    return entry
 
-    # 在地图上绘制资源点
-    for point in group_point[0][2]:
-        point_trans = (
-            int(point.x) - int(lt_point.x),
-            int(point.y) - int(lt_point.y),
-        )
 
-        icon_path = ICON_PATH / f'{resource_name}.png'
-        while True:
-            try:
-                if not icon_path.exists():
-                    await download_file(icon, icon_path)
-                icon_pic = Image.open(icon_path).resize((52, 52))
-            except:  # noqa: E722
-                await download_file(icon, icon_path)
-                continue
-            break
-
-        if point.s == 1:  # type: ignore
-            z = 1
-        else:
-            z = point.z  # type: ignore
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
 
-        if z <= 3:
-            mark = Image.open(TEXT_PATH / f'mark_{z}.png')
-        else:
-            mark = Image.open(TEXT_PATH / 'mark_B.png')
-
-        _m = None
-        if point.s == 1:  # type: ignore
-            _m = Image.open(TEXT_PATH / 'B.png')
-        elif point.s == 3:  # type: ignore
-            _m = Image.open(TEXT_PATH / 'W.png')
-        if _m is not None:
-            mark.paste(_m, (13, 50), _m)
-
-        icon_pic = icon_pic.convert('RGBA')
-        mark.paste(icon_pic, (25, 17), icon_pic)
-
-        mark_size = (70, 70)
-        mark = mark.resize(mark_size)
-
-        genshin_map.paste(
-            mark,
-            (
-                point_trans[0] - mark_size[0] // 2,
-                point_trans[1] - mark_size[1],
-            ),
-            mark,
-        )
 
-    # 转换RGB图
-    genshin_map = genshin_map.convert('RGB')
+async def make_image_response(
+    request: Request, entry: RenderEntry
+) -> Optional[Response]:
+    '''
+    热门资源图直接从内存返回, 客户端已有相同版本时返回 304
 
-    # 转为Bytes,暂时废弃
-    # result_buffer = BytesIO()
-    # genshin_map.save(result_buffer, format='PNG', quality=80, subsampling=0)
+    资源图在绘制完成后可能已被淘汰或失效, 文件不存在时返回 None
+    '''
+    headers = {
+        'ETag': entry.etag,
+        'Cache-Control': f'public, max-age={RENDER_MAX_AGE}',
+        # 未指定格式时按 Accept 协商
+        'Vary': 'Accept',
+    }
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    data = render_cache.memory.get(entry.key)
+    if data is None:
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.run_in_executor(
+                None, render_cache.read, entry.key
+            )
+        except FileNotFoundError:
+            return None
+        # 读取期间资源图可能已被重新绘制
+        if render_cache.entries.get(entry.key) is entry:
+            render_cache.memory.put(entry.key, data)
+    media_type = MEDIA_TYPES[entry.key.rsplit('.', 1)[-1]]
+    return Response(data, media_type=media_type, headers=headers)
 
-    # 进行保存
-    genshin_map.save(save_path, 'JPEG', quality=95)
-    logger.info(f'{prefix} [查询成功]：新增缓存 [{save_path.name}]！')
-    return save_path
+
+@router.get('/cache')
+async def get_render_cache():
+    '''资源图缓存的命中率与清单'''
+    return render_cache.stats()
+
+
+@router.get('/upstream')
+async def get_upstream_stats():
+    '''米游社各接口的请求、重试与熔断状态'''
+    return retry.get_stats()
+
+
+@router.get('/snapshot')
+async def get_snapshot_stats():
+    '''当前使用的米游社数据快照'''
+    return snapshot_manager.stats()
 
 
 @router.get('')
 async def get_map_by_point(
+    request: Request,
     resource_name: str = '甜甜花',
     map_id: Union[str, int] = 0,
     is_cluster: bool = False,
+    format: Optional[str] = None,
+    quality: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
 ):
     req_id = random.randint(10000, 99999)
 
-    def resource_aliases_to_name(resource_name: str) -> str:
-        resource_name = resource_name.lower()
-        for m in resource_aliases:
-            for a in resource_aliases[m]:
-                if resource_name == a:
-                    return a
-                if resource_name in resource_aliases[m][a]:
-                    return a
-        return resource_name
+    # 输出格式与大小限制
+    try:
+        options = resolve_options(
+            request.headers.get('accept'), format, quality, max_bytes
+        )
+    except ValueError as e:
+        return {'retcode': -1, 'message': str(e)}
+    if (max_width is not None and max_width <= 0) or (
+        max_height is not None and max_height <= 0
+    ):
+        return {'retcode': -1, 'message': 'max_width 与 max_height 应大于 0'}
 
     # 判断别名
-    resource_name = resource_aliases_to_name(resource_name)
+    resource_name = alias_index.resolve(resource_name)
 
     prefix = f'>> [请求序列:{req_id}]'
     logger.info(
@@ -338,13 +505,29 @@ async def get_map_by_point(
             }
         maps = [MAP_ID_DICT[str(map_id)]]
     else:
-        # 自动选择地图
-        maps = list(MAP_ID_DICT.values())
-
-    for idx, map in enumerate(maps):
-        res = await get_map_response(prefix, resource_name, map, is_cluster)
-        if res:
-            return FileResponse(res)
+        # 自动选择地图, 只尝试包含该资源的地图, 坐标点多的地图优先
+        resource_index = await get_resource_index(list(MAP_ID_DICT.values()))
+        locations = resource_index.find(resource_name)
+        maps = [location.map_id for location in locations]
+
+    for map in maps:
+        # 资源图在返回前被淘汰或失效时重新绘制一次
+        for _ in range(2):
+            entry = await get_map_response(
+                prefix,
+                resource_name,
+                map,
+                is_cluster,
+                options,
+                max_width,
+                max_height,
+            )
+            if entry is None:
+                break
+            response = await make_image_response(request, entry)
+            if response is not None:
+                return response
+            logger.info(f'{prefix} [重新绘制]：资源图 [{entry.key}] 已被移除')
         if len(maps) > 1:
             logger.info(
                 f'{prefix} [自动重试]：地图 ID {map._value_} 内不存在 {resource_name}...'
@@ -353,4 +536,5 @@ async def get_map_by_point(
     return {
         'retcode': -1,
         'message': f'资源点 - {resource_name} 不存在！',
+        'suggestions': alias_index.suggest(resource_name),
     }
@@ -0,0 +1,134 @@
+import json
+import math
+import asyncio
+from pathlib import Path
+from typing import Dict, Tuple, Iterable
+
+from PIL import Image, PngImagePlugin
+
+from .logger import logger
+from .sprite import ICON_SIZE
+from .download import download_file
+from .singleflight import SingleFlight
+from .config import ICON_RETRIES, ICON_CONCURRENCY, ICON_RETRY_BACKOFF
+
+ICON_PATH = Path(__file__).parent / 'icon_data'
+ATLAS_PATH = ICON_PATH / 'atlas.png'
+# 图集每行的图标数量
+ATLAS_COLUMNS = 32
+
+
+class IconError(Exception):
+    '''图标多次下载失败'''
+
+
+class IconStore:
+    '''
+    资源图标存储
+
+    查找顺序: 内存 -> 图集 -> icon_data 下的单个文件 -> 下载
+    同一个 URL 的并发下载只会发起一次, 失败时按指数退避重试
+    '''
+
+    def __init__(
+        self, icon_path: Path = ICON_PATH, atlas_path: Path = ATLAS_PATH
+    ):
+        self.icon_path = icon_path
+        self.atlas_path = atlas_path
+        self._icons: Dict[str, Image.Image] = {}
+        self._flight: SingleFlight[str, Path] = SingleFlight()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._icons
+
+    async def get(self, name: str, url: str) -> Image.Image:
+        icon = self._icons.get(name)
+        if icon is not None:
+            return icon
+
+        path = self.icon_path / f'{name}.png'
+        try:
+            icon = self._open(path)
+        except Exception:
+            # 同一 URL 只下载一次, 共享已下载的文件
+            icon = self._open(
+                await self._flight.do(url, lambda: self._download(url, path))
+            )
+        self._icons[name] = icon
+        return icon
+
+    @staticmethod
+    def _open(path: Path) -> Image.Image:
+        with Image.open(path) as img:
+            return img.convert('RGBA').resize(ICON_SIZE)
+
+    async def _download(self, url: str, path: Path) -> Path:
+        for attempt in range(ICON_RETRIES):
+            try:
+                await download_file(url, path)
+                # 校验文件是否为完整图片
+                with Image.open(path) as img:
+                    img.verify()
+                return path
+            except Exception as e:
+                logger.warning(
+                    f'图标 {url} 下载失败 ({attempt + 1}/{ICON_RETRIES}): {e}'
+                )
+                path.unlink(missing_ok=True)
+                if attempt + 1 < ICON_RETRIES:
+                    await asyncio.sleep(ICON_RETRY_BACKOFF * 2**attempt)
+        logger.error(f'图标 {url} 下载失败, 已达最大重试次数')
+        raise IconError(url)
+
+    async def prefetch(self, icons: Iterable[Tuple[str, str]]):
+        '''并发下载全部图标, 并重新打包图集'''
+        semaphore = asyncio.Semaphore(ICON_CONCURRENCY)
+
+        async def _get(name: str, url: str):
+            async with semaphore:
+                try:
+                    await self.get(name, url)
+                except IconError:
+                    pass
+
+        await asyncio.gather(
+            *[_get(name, url) for name, url in dict(icons).items() if url]
+        )
+        self.save_atlas()
+
+    def load_atlas(self):
+        if not self.atlas_path.exists():
+            return
+        with Image.open(self.atlas_path) as atlas:
+            atlas.load()
+            index: Dict[str, Tuple[int, int]] = json.loads(atlas.text['index'])
+            for name, (x, y) in index.items():
+                self._icons.setdefault(
+                    name,
+                    atlas.crop((x, y, x + ICON_SIZE[0], y + ICON_SIZE[1])),
+                )
+        logger.info(f'已从图集加载 {len(index)} 个图标')
+
+    def save_atlas(self):
+        if not self._icons:
+            return
+        width, height = ICON_SIZE
+        columns = min(ATLAS_COLUMNS, len(self._icons))
+        rows = math.ceil(len(self._icons) / columns)
+        atlas = Image.new('RGBA', (columns * width, rows * height))
+        index: Dict[str, Tuple[int, int]] = {}
+        for i, (name, icon) in enumerate(sorted(self._icons.items())):
+            row, column = divmod(i, columns)
+            index[name] = (column * width, row * height)
+            atlas.paste(icon, index[name])
+
+        info = PngImagePlugin.PngInfo()
+        info.add_text('index', json.dumps(index, ensure_ascii=False))
+        tmp_path = self.atlas_path.with_name(f'{self.atlas_path.name}.tmp')
+        atlas.save(tmp_path, 'PNG', pnginfo=info)
+        tmp_path.replace(self.atlas_path)
+        logger.info(f'图集已保存, 共 {len(index)} 个图标')
+
+
+ICON_PATH.mkdir(exist_ok=True)
+icon_store = IconStore()
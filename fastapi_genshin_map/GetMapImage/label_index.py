@@ -0,0 +1,106 @@
+from typing import Dict, List, Tuple, Iterator, Optional, NamedTuple
+
+from .GenshinMap.genshinmap import models, request
+from .GenshinMap.genshinmap.store import PointStore
+from .GenshinMap.genshinmap.decode import LabelRecord
+
+
+class LabelEntry(NamedTuple):
+    id: int
+    name: str
+    icon: str
+    tree: LabelRecord
+
+
+def normalize_name(name: str) -> str:
+    # 文件名中的 / 会被替换为 _, 两种写法都能查到
+    return name.strip().lower().replace('/', '_')
+
+
+class LabelIndex:
+    '''
+    单张地图的资源索引, 在获取资源树时一次性构建
+
+    labels: 规范化名称 -> LabelEntry, 子资源优先于同名的分类
+    children: 规范化分类名称 -> 分类下的全部子资源
+    '''
+
+    def __init__(self, trees: List[LabelRecord]):
+        self.trees = trees
+        self.labels: Dict[str, LabelEntry] = {}
+        self.children: Dict[str, Tuple[LabelRecord, ...]] = {}
+
+        for tree in trees:
+            self.children[normalize_name(tree.name)] = tree.children
+            for label in tree.children:
+                self.labels.setdefault(
+                    normalize_name(label.name),
+                    LabelEntry(label.id, label.name, str(label.icon), tree),
+                )
+        for tree in trees:
+            self.labels.setdefault(
+                normalize_name(tree.name),
+                LabelEntry(tree.id, tree.name, tree.icon, tree),
+            )
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self.labels
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def find(self, name: str) -> Optional[LabelEntry]:
+        return self.labels.get(normalize_name(name))
+
+    def get_children(self, tree_name: str) -> Tuple[LabelRecord, ...]:
+        return self.children.get(normalize_name(tree_name), ())
+
+    def iter_icons(self) -> Iterator[Tuple[str, str]]:
+        # (图标文件名, 图标 URL)
+        for entry in self.labels.values():
+            if entry.icon:
+                yield entry.name.replace('/', '_'), entry.icon
+
+
+class ResourceLocation(NamedTuple):
+    map_id: models.MapID
+    label_id: int
+    count: int
+
+
+class ResourceIndex:
+    '''
+    全部地图的资源索引: 规范化名称 -> 包含该资源的地图, 按坐标点数量降序
+
+    由各地图的 LabelIndex 与 PointStore 构建, 任一地图的缓存刷新后重新构建
+    '''
+
+    def __init__(
+        self, sources: Dict[models.MapID, Tuple[LabelIndex, PointStore]]
+    ):
+        self.sources = sources
+        self.resources: Dict[str, List[ResourceLocation]] = {}
+        for map_id, (label_index, points) in sources.items():
+            for name, entry in label_index.labels.items():
+                self.resources.setdefault(name, []).append(
+                    ResourceLocation(map_id, entry.id, points.count(entry.id))
+                )
+        for locations in self.resources.values():
+            locations.sort(key=lambda location: location.count, reverse=True)
+
+    def is_built_from(
+        self, sources: Dict[models.MapID, Tuple[LabelIndex, PointStore]]
+    ) -> bool:
+        return sources.keys() == self.sources.keys() and all(
+            label_index is self.sources[map_id][0]
+            and points is self.sources[map_id][1]
+            for map_id, (label_index, points) in sources.items()
+        )
+
+    def find(self, name: str) -> List[ResourceLocation]:
+        return self.resources.get(normalize_name(name), [])
+
+
+async def load_label_index(map_id: models.MapID) -> LabelIndex:
+    # 先完整构建再替换缓存, 刷新过程中查询到的始终是完整索引
+    return LabelIndex(await request.get_label_records(map_id))
@@ -1,24 +1,31 @@
 import logging
 
-import fastapi
-import rollbar
-from rollbar.contrib.fastapi import LoggerMiddleware
-from rollbar.logger import RollbarHandler
-
-# Initialize Rollbar SDK with your server-side access token
-rollbar.init(
-    'ACCESS_TOKEN',
-    environment='staging',
-    handler='async',
-)
-
 # Set root logger to log DEBUG and above
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Report ERROR and above to Rollbar
-rollbar_handler = RollbarHandler()
-rollbar_handler.setLevel(logging.ERROR)
+_rollbar_handler = None
+
+
+def init_rollbar():
+    '''Rollbar 导入较慢, 在服务启动时才初始化, 渲染子进程中不会初始化'''
+    global _rollbar_handler
+    if _rollbar_handler is not None:
+        return
+
+    import rollbar
+    from rollbar.logger import RollbarHandler
+
+    # Initialize Rollbar SDK with your server-side access token
+    rollbar.init(
+        'ACCESS_TOKEN',
+        environment='staging',
+        handler='async',
+    )
+
+    # Report ERROR and above to Rollbar
+    _rollbar_handler = RollbarHandler()
+    _rollbar_handler.setLevel(logging.ERROR)
 
-# Attach Rollbar handler to the root logger
-logger.addHandler(rollbar_handler)
+    # Attach Rollbar handler to the root logger
+    logger.addHandler(_rollbar_handler)
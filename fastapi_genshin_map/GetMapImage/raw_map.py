@@ -0,0 +1,155 @@
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Iterator
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from PIL import Image
+
+from .logger import logger
+from .config import BAND_HEIGHT, PYRAMID_LEVELS
+
+_RAW_MAPS: Dict[Path, 'RawMap'] = {}
+
+
+class RawMap:
+    '''以 .npy (H, W, 4) RGBA 行优先格式保存的地图, 通过 mmap 只读取裁切范围'''
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.mtime = path.stat().st_mtime_ns
+        self.array: np.ndarray = np.load(path, mmap_mode='r')
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.array.shape[1], self.array.shape[0]
+
+    def crop(self, box: Tuple[int, int, int, int]) -> Image.Image:
+        # 与 Image.crop 一致, 超出地图的部分用透明像素填充
+        left, top, right, bottom = box
+        width, height = self.size
+        canvas = np.zeros(
+            (max(bottom - top, 0), max(right - left, 0), 4), dtype=np.uint8
+        )
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(right, width), min(bottom, height)
+        if x0 < x1 and y0 < y1:
+            canvas[y0 - top : y1 - top, x0 - left : x1 - left] = self.array[
+                y0:y1, x0:x1
+            ]
+        return Image.fromarray(canvas, 'RGBA')
+
+
+@contextmanager
+def raw_map_writer(path: Path, size: Tuple[int, int]) -> Iterator[np.ndarray]:
+    # 写入临时文件, 全部写完后再替换, 中断时不会留下不完整的地图
+    width, height = size
+    tmp_path = path.with_suffix('.npy.tmp')
+    array = open_memmap(
+        tmp_path, mode='w+', dtype=np.uint8, shape=(height, width, 4)
+    )
+    try:
+        yield array
+        array.flush()
+    finally:
+        del array
+    tmp_path.replace(path)
+    _RAW_MAPS.pop(path, None)
+    logger.info(f'原始地图 {path.name} 已保存！')
+
+
+def save_raw_map(img: Image.Image, path: Path):
+    img = img if img.mode == 'RGBA' else img.convert('RGBA')
+    width, height = img.size
+    with raw_map_writer(path, img.size) as array:
+        for top in range(0, height, BAND_HEIGHT):
+            bottom = min(top + BAND_HEIGHT, height)
+            array[top:bottom] = np.asarray(img.crop((0, top, width, bottom)))
+
+
+def export_png(path: Path, png_path: Path):
+    # 直接引用 mmap 的内存导出 PNG, 不额外复制整张地图
+    raw_map = RawMap(path)
+    img = Image.frombuffer(
+        'RGBA', raw_map.size, raw_map.array, 'raw', 'RGBA', 0, 1
+    )
+    tmp_path = png_path.with_name(f'{png_path.name}.tmp')
+    img.save(tmp_path, 'PNG')
+    tmp_path.replace(png_path)
+
+
+def convert_png_to_raw(png_path: Path, path: Path):
+    # 兼容旧版本只保存了 PNG 的情况, 仅在初始化时解码一次
+    logger.info(f'正在将 {png_path.name} 转换为原始地图...')
+    with Image.open(png_path) as img:
+        save_raw_map(img, path)
+
+
+def pyramid_path(path: Path, factor: int) -> Path:
+    '''缩小为 1/factor 的地图路径, 如 teyvat.down2.npy'''
+    return path.with_name(f'{path.stem}.down{factor}.npy')
+
+
+def has_pyramid(path: Path, levels: int = PYRAMID_LEVELS) -> bool:
+    return all(
+        pyramid_path(path, 2**level).exists() for level in range(1, levels + 1)
+    )
+
+
+def build_pyramid(path: Path, levels: int = PYRAMID_LEVELS) -> List[Path]:
+    '''
+    由原始地图逐级生成 1/2, 1/4 ... 的缩小地图, 每级由上一级按 2x2 平均得到
+
+    按行带处理, 内存峰值与拼接地图时相当; 多余的旧层级会被删除
+    '''
+    paths = []
+    source = path
+    # 每个输出行对应两行 uint16 的输入, 行数取拼接行带的 1/4
+    rows = max(BAND_HEIGHT // 4, 1)
+    for level in range(1, levels + 1):
+        src = RawMap(source).array
+        height, width = src.shape[0] // 2, src.shape[1] // 2
+        if not height or not width:
+            break
+        target = pyramid_path(path, 2**level)
+        with raw_map_writer(target, (width, height)) as array:
+            for top in range(0, height, rows):
+                bottom = min(top + rows, height)
+                band = src[top * 2 : bottom * 2, : width * 2].astype(np.uint16)
+                array[top:bottom] = (
+                    band[0::2, 0::2]
+                    + band[1::2, 0::2]
+                    + band[0::2, 1::2]
+                    + band[1::2, 1::2]
+                    + 2
+                ) // 4
+        paths.append(target)
+        source = target
+
+    level = len(paths) + 1
+    while pyramid_path(path, 2**level).exists():
+        pyramid_path(path, 2**level).unlink()
+        level += 1
+    return paths
+
+
+def load_level(path: Path, scale: float) -> Tuple[RawMap, int]:
+    '''
+    选择缩小倍数不超过 scale 的最小层级, 返回地图与缩小倍数
+
+    例如 scale 为 5 时使用 1/4 的地图, 层级不存在时使用原始地图
+    '''
+    factor = 1
+    while factor * 2 <= scale and pyramid_path(path, factor * 2).exists():
+        factor *= 2
+    if factor == 1:
+        return load_raw_map(path), 1
+    return load_raw_map(pyramid_path(path, factor)), factor
+
+
+def load_raw_map(path: Path) -> RawMap:
+    # 地图更新后文件会被替换, 各渲染进程据此重新映射
+    raw_map = _RAW_MAPS.get(path)
+    if raw_map is None or raw_map.mtime != path.stat().st_mtime_ns:
+        raw_map = _RAW_MAPS[path] = RawMap(path)
+    return raw_map
@@ -0,0 +1,169 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from pathlib import Path
+from typing import Tuple, Optional, NamedTuple
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from .logger import logger
+from .raw_map import load_level
+from .encode import EncodeOptions, encode_image
+from .sprite import ICON_SIZE, MARK_SIZE, sprite_cache
+from .config import RENDER_WORKERS, RENDER_EXECUTOR
+from .GenshinMap.genshinmap.store import PointColumns
+
+Image.MAX_IMAGE_PIXELS = 603120000
+
+_executor: Optional[Executor] = None
+# 服务进程中已有多个线程, 子进程使用 spawn 启动而不是 fork
+MP_CONTEXT = multiprocessing.get_context('spawn')
+
+
+class RenderJob(NamedTuple):
+    '''
+    一次渲染所需的全部数据, 可直接传给子进程
+
+    x, y, z, s 为资源点在整张地图上的坐标、层级和角标
+    size 为输出图片的大小, 为裁切范围缩小 2 的幂倍, 直接从对应的地图层级裁切
+    icon 为 ICON_SIZE 大小的 RGBA 原始像素
+    options 为输出图片的编码参数
+    '''
+
+    map_path: Path
+    raw_path: Path
+    box: Tuple[int, int, int, int]
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    s: np.ndarray
+    icon_name: str
+    icon: bytes
+    save_path: Path
+    options: EncodeOptions
+    size: Tuple[int, int]
+
+
+def downscale_factor(
+    box: Tuple[int, int, int, int],
+    max_width: Optional[int] = None,
+    max_height: Optional[int] = None,
+) -> int:
+    '''
+    裁切范围缩小到不超过最大宽高所需的倍数, 不放大
+
+    倍数取 2 的幂, 与地图层级一致, 同一资源图只会有少数几种缓存文件
+    '''
+    width, height = box[2] - box[0], box[3] - box[1]
+    factor = 1
+    while width > factor * (max_width or width) or height > factor * (
+        max_height or height
+    ):
+        factor *= 2
+    return factor
+
+
+def make_render_job(
+    map_path: Path,
+    raw_path: Path,
+    box: Tuple[int, int, int, int],
+    columns: PointColumns,
+    icon_name: str,
+    icon_pic: Image.Image,
+    save_path: Path,
+    options: EncodeOptions,
+    factor: int = 1,
+) -> RenderJob:
+    width, height = box[2] - box[0], box[3] - box[1]
+    return RenderJob(
+        map_path,
+        raw_path,
+        box,
+        columns.x,
+        columns.y,
+        columns.z,
+        columns.s,
+        icon_name,
+        icon_pic.convert('RGBA').resize(ICON_SIZE).tobytes(),
+        save_path,
+        options,
+        (max(width // factor, 1), max(height // factor, 1)),
+    )
+
+
+def render(job: RenderJob) -> Path:
+    '''裁切地图并绘制资源点, 在执行器中运行'''
+    left, top, right, bottom = job.box
+    ratio_x = job.size[0] / (right - left)
+    ratio_y = job.size[1] / (bottom - top)
+    if job.raw_path.exists():
+        # 从不小于输出大小的最小层级裁切, 耗时取决于输出大小而不是裁切范围
+        raw_map, factor = load_level(job.raw_path, 1 / max(ratio_x, ratio_y))
+        genshin_map = raw_map.crop(tuple(v // factor for v in job.box))
+    else:
+        with Image.open(job.map_path) as img:
+            genshin_map = img.crop(job.box)
+    if genshin_map.size != job.size:
+        genshin_map = genshin_map.resize(job.size, Image.LANCZOS)
+
+    # 资源点位置按比例换算, 标记保持原有大小
+    icon_pic = Image.frombytes('RGBA', ICON_SIZE, job.icon)
+    xs = np.floor((job.x - left) * ratio_x).astype(np.int64)
+    ys = np.floor((job.y - top) * ratio_y).astype(np.int64)
+    xs -= MARK_SIZE[0] // 2
+    ys -= MARK_SIZE[1]
+    for x, y, z, s in zip(
+        xs.tolist(), ys.tolist(), job.z.tolist(), job.s.tolist()
+    ):
+        mark = sprite_cache.get(job.icon_name, icon_pic, z, s)
+        genshin_map.paste(mark, (x, y), mark)
+
+    # 转换RGB图, 写入临时文件后重命名, 避免读到未写完的文件
+    genshin_map = genshin_map.convert('RGB')
+    tmp_path = job.save_path.with_name(
+        f'.{job.save_path.name}.{os.getpid()}.{threading.get_ident()}.tmp'
+    )
+    tmp_path.write_bytes(encode_image(genshin_map, job.options))
+    tmp_path.replace(job.save_path)
+    return job.save_path
+
+
+def init_worker():
+    '''渲染子进程启动时解码贴图, 首次渲染无需等待'''
+    sprite_cache.load()
+
+
+def start_executor() -> Executor:
+    '''
+    在服务启动时创建渲染执行器
+
+    贴图只在实际渲染的进程中解码, 多进程时服务进程不再加载
+    '''
+    global _executor
+    if _executor is None:
+        if RENDER_EXECUTOR == 'thread':
+            sprite_cache.load()
+            _executor = ThreadPoolExecutor(RENDER_WORKERS)
+        else:
+            _executor = ProcessPoolExecutor(
+                RENDER_WORKERS,
+                mp_context=MP_CONTEXT,
+                initializer=init_worker,
+            )
+        logger.info(f'渲染执行器已启动: {RENDER_EXECUTOR} x {RENDER_WORKERS}')
+    return _executor
+
+
+async def run_render(job: RenderJob) -> Path:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(start_executor(), render, job)
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
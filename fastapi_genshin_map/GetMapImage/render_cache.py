@@ -0,0 +1,237 @@
+import json
+import time
+import asyncio
+from pathlib import Path
+from hashlib import blake2b
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .logger import logger
+from .encode import MEDIA_TYPES
+from .config import HOT_CACHE_SIZE, RENDER_CACHE_SIZE, RENDER_CACHE_POLICY
+
+RESOURCE_PATH = Path(__file__).parent / 'resource_data'
+INDEX_PATH = RESOURCE_PATH / 'index.json'
+
+
+class RenderEntry(BaseModel):
+    key: str
+    map_version: Optional[str] = None
+    fingerprint: str = ''
+    size: int = 0
+    created: float = 0
+    last_hit: float = 0
+    hits: int = 0
+
+    @property
+    def etag(self) -> str:
+        # 同一资源图只要地图版本与资源点不变, ETag 就不变
+        digest = blake2b(digest_size=12)
+        for part in (self.key, self.map_version or '', self.fingerprint):
+            digest.update(part.encode())
+        return f'"{digest.hexdigest()}"'
+
+
+class MemoryCache:
+    '''热门资源图的编码结果, 按总字节数淘汰最久未使用的图片'''
+
+    def __init__(self, max_bytes: int = HOT_CACHE_SIZE * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._data: 'OrderedDict[str, bytes]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._data.get(key)
+        if data is not None:
+            self._data.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        self.pop(key)
+        self._data[key] = data
+        self.total_bytes += len(data)
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+    def pop(self, key: str):
+        data = self._data.pop(key, None)
+        if data is not None:
+            self.total_bytes -= len(data)
+
+
+class RenderCache:
+    '''
+    资源图缓存索引
+
+    记录每张资源图对应的地图版本、资源点指纹、大小与命中情况,
+    资源点变化后缓存失效, 超出磁盘配额时按 LRU 或 LFU 淘汰
+    '''
+
+    def __init__(
+        self,
+        root: Path = RESOURCE_PATH,
+        max_bytes: int = RENDER_CACHE_SIZE * 1024 * 1024,
+        policy: str = RENDER_CACHE_POLICY,
+    ):
+        self.root = root
+        self.index_path = root / INDEX_PATH.name
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.memory = MemoryCache()
+        self.entries: Dict[str, RenderEntry] = {}
+        self.hits = 0
+        self.misses = 0
+        # 缓存总大小随增删更新, 索引有变化时标记, 由 flush 定期写入
+        self.total_bytes = 0
+        self.dirty = False
+
+    def load(self):
+        self.root.mkdir(exist_ok=True)
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    entry = RenderEntry.parse_obj(item)
+                    if (self.root / entry.key).exists():
+                        self.entries[entry.key] = entry
+        # 没有索引记录的旧缓存, 指纹为空, 下次请求时会重新绘制
+        for path in self.root.iterdir():
+            if path.suffix[1:] not in MEDIA_TYPES:
+                continue
+            if path.name not in self.entries:
+                stat = path.stat()
+                self.entries[path.name] = RenderEntry(
+                    key=path.name,
+                    size=stat.st_size,
+                    created=stat.st_mtime,
+                    last_hit=stat.st_mtime,
+                )
+        self.total_bytes = sum(entry.size for entry in self.entries.values())
+        logger.info(
+            f'[缓存] 已加载 {len(self.entries)} 张资源图, '
+            f'共 {self.total_bytes / 1024 / 1024:.1f} MB'
+        )
+
+    def _write(self, items: List[Dict[str, Any]]):
+        tmp_path = self.index_path.with_name(f'{self.index_path.name}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False)
+        tmp_path.replace(self.index_path)
+
+    def save(self):
+        '''立即写入索引, 用于关闭服务时'''
+        self.dirty = False
+        self._write([entry.dict() for entry in self.entries.values()])
+
+    async def flush(self):
+        '''索引有变化时在线程池中写入, 不阻塞事件循环'''
+        if not self.dirty:
+            return
+        self.dirty = False
+        items = [entry.dict() for entry in self.entries.values()]
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, items)
+        except Exception:
+            self.dirty = True
+            raise
+
+    def lookup(self, key: str, fingerprint: str) -> Optional[RenderEntry]:
+        entry = self.entries.get(key)
+        path = self.root / key
+        # 内存中已有的图片无需再检查文件
+        if (
+            entry is None
+            or entry.fingerprint != fingerprint
+            or (key not in self.memory and not path.exists())
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.hits += 1
+        entry.last_hit = time.time()
+        self.dirty = True
+        return entry
+
+    def read(self, key: str) -> bytes:
+        '''读取资源图, 在线程池中调用'''
+        return (self.root / key).read_bytes()
+
+    def add(
+        self, key: str, fingerprint: str, map_version: Optional[str]
+    ) -> RenderEntry:
+        self.remove(key, unlink=False)
+        now = time.time()
+        entry = self.entries[key] = RenderEntry(
+            key=key,
+            map_version=map_version,
+            fingerprint=fingerprint,
+            size=(self.root / key).stat().st_size,
+            created=now,
+            last_hit=now,
+        )
+        self.total_bytes += entry.size
+        self.dirty = True
+        self.evict()
+        return entry
+
+    def evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        if self.policy == 'lfu':
+            order = sorted(
+                self.entries.values(), key=lambda e: (e.hits, e.last_hit)
+            )
+        else:
+            order = sorted(self.entries.values(), key=lambda e: e.last_hit)
+        for entry in order:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.remove(entry.key)
+            logger.info(f'[缓存] 淘汰资源图 {entry.key}')
+
+    def remove(self, key: str, unlink: bool = True):
+        self.memory.pop(key)
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+            self.dirty = True
+        if unlink:
+            (self.root / key).unlink(missing_ok=True)
+
+    def invalidate(self, prefix: str):
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            self.remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            'count': len(self.entries),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'policy': self.policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / requests if requests else 0,
+            'memory_count': len(self.memory),
+            'memory_bytes': self.memory.total_bytes,
+            'memory_max_bytes': self.memory.max_bytes,
+            'entries': sorted(
+                (entry.dict() for entry in self.entries.values()),
+                key=lambda e: e['hits'],
+                reverse=True,
+            ),
+        }
+
+
+render_cache = RenderCache()
@@ -0,0 +1,24 @@
+import asyncio
+from typing import Dict, Generic, TypeVar, Callable, Awaitable
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class SingleFlight(Generic[K, V]):
+    '''同一个 key 同时只执行一次, 其余调用者等待并共享结果'''
+
+    def __init__(self):
+        self._tasks: Dict[K, 'asyncio.Future[V]'] = {}
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._tasks
+
+    async def do(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # 某个调用者被取消时不影响其他等待者
+        return await asyncio.shield(task)
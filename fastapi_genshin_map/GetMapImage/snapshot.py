@@ -0,0 +1,186 @@
+import json
+import time
+import shutil
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional, NamedTuple
+
+from .logger import logger
+from .label_index import LabelIndex
+from .GenshinMap.genshinmap import models, request
+from .GenshinMap.genshinmap.store import PointStore
+from .GenshinMap.genshinmap.decode import LabelRecord, decode_labels
+from .api_cache import maps_cache, labels_cache, points_cache
+
+SNAPSHOT_PATH = Path(__file__).parent / 'map_data' / 'snapshot'
+CURRENT_PATH = SNAPSHOT_PATH / 'CURRENT'
+# 快照格式版本, 格式变化后旧快照不再读取
+SNAPSHOT_FORMAT = 1
+
+
+class MapSnapshot(NamedTuple):
+    info: models.MapInfo
+    labels: List[LabelRecord]
+    points: PointStore
+    page_labels: List[models.PageLabel]
+    anchors: List[models.Anchor]
+
+
+class Snapshot(NamedTuple):
+    '''
+    米游社接口数据的快照
+
+    每个版本保存在单独的目录中: data.json 保存地图信息、资源树、标签与锚点,
+    {地图}.npz 保存坐标点列; CURRENT 记录当前版本, 写入完成后原子替换
+    '''
+
+    version: str
+    created: float
+    maps: Dict[models.MapID, MapSnapshot]
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.created)
+
+
+async def fetch_map_snapshot(map_id: models.MapID) -> MapSnapshot:
+    info = await request.get_maps(map_id)
+    labels, points, page_labels, anchors = await asyncio.gather(
+        request.get_label_records(map_id),
+        request.get_point_store(map_id, info.get_detail.origin),
+        request.get_page_label(map_id),
+        request.get_anchors(map_id),
+    )
+    return MapSnapshot(info, labels, points, page_labels, anchors)
+
+
+async def fetch_snapshot(map_ids: List[models.MapID]) -> Snapshot:
+    '''从米游社获取全部地图的数据'''
+    results = await asyncio.gather(
+        *[fetch_map_snapshot(map_id) for map_id in map_ids]
+    )
+    now = datetime.now()
+    return Snapshot(
+        now.strftime('%Y%m%d%H%M%S%f'),
+        now.timestamp(),
+        dict(zip(map_ids, results)),
+    )
+
+
+def save_snapshot(snapshot: Snapshot):
+    '''写入新版本的快照目录后切换 CURRENT, 再删除旧版本'''
+    SNAPSHOT_PATH.mkdir(parents=True, exist_ok=True)
+    tmp_dir = SNAPSHOT_PATH / f'{snapshot.version}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    data = {
+        'format': SNAPSHOT_FORMAT,
+        'version': snapshot.version,
+        'created': snapshot.created,
+        'maps': {},
+    }
+    for map_id, item in snapshot.maps.items():
+        data['maps'][map_id.name] = {
+            'info': item.info.dict(),
+            'labels': [tree.to_dict() for tree in item.labels],
+            'page_labels': [label.dict() for label in item.page_labels],
+            'anchors': [anchor.dict() for anchor in item.anchors],
+        }
+        item.points.save(tmp_dir / f'{map_id.name}.npz')
+    with open(tmp_dir / 'data.json', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    tmp_dir.replace(SNAPSHOT_PATH / snapshot.version)
+
+    tmp_path = CURRENT_PATH.with_name(f'{CURRENT_PATH.name}.tmp')
+    tmp_path.write_text(snapshot.version, encoding='utf-8')
+    tmp_path.replace(CURRENT_PATH)
+
+    for path in SNAPSHOT_PATH.iterdir():
+        if path.is_dir() and path.name != snapshot.version:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_snapshot() -> Optional[Snapshot]:
+    '''读取当前版本的快照, 不存在或格式不兼容时返回 None'''
+    if not CURRENT_PATH.exists():
+        return None
+    directory = SNAPSHOT_PATH / CURRENT_PATH.read_text(encoding='utf-8')
+    try:
+        with open(directory / 'data.json', 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != SNAPSHOT_FORMAT:
+            logger.warning(f'[快照] 快照格式 {data.get("format")} 不兼容, 已忽略')
+            return None
+        maps = {}
+        for name, item in data['maps'].items():
+            map_id = models.MapID[name]
+            maps[map_id] = MapSnapshot(
+                models.MapInfo.parse_obj(item['info']),
+                decode_labels(item['labels']),
+                PointStore.load(directory / f'{name}.npz'),
+                [models.PageLabel.parse_obj(i) for i in item['page_labels']],
+                [models.Anchor.parse_obj(i) for i in item['anchors']],
+            )
+    except Exception as e:
+        logger.warning(f'[快照] 读取快照 {directory.name} 失败: {e}')
+        return None
+    return Snapshot(data['version'], data['created'], maps)
+
+
+def apply_snapshot(snapshot: Snapshot):
+    '''将快照写入接口缓存, 快照过期时下次读取会在后台刷新'''
+    for map_id, item in snapshot.maps.items():
+        maps_cache.put(map_id, item.info, snapshot.age)
+        labels_cache.put(map_id, LabelIndex(item.labels), snapshot.age)
+        points_cache.put(map_id, item.points, snapshot.age)
+
+
+def set_offline(offline: bool):
+    '''离线模式下只使用快照中的数据, 不请求米游社接口'''
+    for cache in (maps_cache, labels_cache, points_cache):
+        cache.offline = offline
+
+
+class SnapshotManager:
+    '''当前使用的快照, 启动时从磁盘读取, 后台刷新后原子切换'''
+
+    def __init__(self):
+        self.current: Optional[Snapshot] = None
+
+    def load(self) -> Optional[Snapshot]:
+        start = time.perf_counter()
+        snapshot = load_snapshot()
+        if snapshot is not None:
+            apply_snapshot(snapshot)
+            self.current = snapshot
+            logger.info(
+                f'[快照] 已加载快照 {snapshot.version}, '
+                f'耗时 {(time.perf_counter() - start) * 1000:.1f} ms'
+            )
+        return snapshot
+
+    async def refresh(self, map_ids: List[models.MapID]) -> Snapshot:
+        snapshot = await fetch_snapshot(map_ids)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, save_snapshot, snapshot)
+        # 写入完成后才切换, 请求期间始终使用完整的旧快照
+        apply_snapshot(snapshot)
+        self.current = snapshot
+        logger.info(f'[快照] 已更新快照 {snapshot.version}')
+        return snapshot
+
+    def stats(self):
+        if self.current is None:
+            return {'version': None}
+        return {
+            'version': self.current.version,
+            'created': self.current.created,
+            'age': round(self.current.age, 1),
+            'maps': [map_id.name for map_id in self.current.maps],
+            'offline': maps_cache.offline,
+        }
+
+
+snapshot_manager = SnapshotManager()
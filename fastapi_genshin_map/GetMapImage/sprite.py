@@ -0,0 +1,95 @@
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional
+
+from PIL import Image
+
+from .config import SPRITE_CACHE_SIZE
+
+TEXT_PATH = Path(__file__).parent / 'texture2d'
+MARK_SIZE = (70, 70)
+ICON_SIZE = (52, 52)
+
+SpriteKey = Tuple[str, str, Optional[str]]
+
+
+def load_textures() -> Dict[str, Image.Image]:
+    textures = {}
+    for path in TEXT_PATH.glob('*.png'):
+        with Image.open(path) as img:
+            textures[path.stem] = img.convert('RGBA')
+    return textures
+
+
+class SpriteCache:
+    '''
+    资源点标记图缓存, 每种 (图标, 标记底图, 角标) 只合成一次
+
+    超出容量时淘汰最久未使用的标记图
+    '''
+
+    def __init__(
+        self,
+        textures: Optional[Dict[str, Image.Image]] = None,
+        maxsize: int = SPRITE_CACHE_SIZE,
+    ):
+        self._textures = textures
+        self.maxsize = maxsize
+        self._sprites: 'OrderedDict[SpriteKey, Image.Image]' = OrderedDict()
+        # 线程池渲染时会被多个线程同时访问
+        self._lock = threading.Lock()
+
+    @property
+    def textures(self) -> Dict[str, Image.Image]:
+        # 首次使用时才解码贴图, 渲染子进程中各自加载一次
+        if self._textures is None:
+            self.load()
+        return self._textures  # type: ignore
+
+    def load(self):
+        self._textures = load_textures()
+
+    @staticmethod
+    def make_key(icon_name: str, z: int, s: int) -> SpriteKey:
+        # 角标为 1 时固定使用 1 层底图
+        if s == 1:
+            z = 1
+        mark = f'mark_{z}' if z <= 3 else 'mark_B'
+        badge = {1: 'B', 3: 'W'}.get(s)
+        return icon_name, mark, badge
+
+    def get(
+        self, icon_name: str, icon_pic: Image.Image, z: int, s: int
+    ) -> Image.Image:
+        key = self.make_key(icon_name, z, s)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                return sprite
+
+        sprite = self._compose(key, icon_pic)
+        with self._lock:
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.maxsize:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    def _compose(self, key: SpriteKey, icon_pic: Image.Image) -> Image.Image:
+        _, mark_name, badge = key
+        mark = self.textures[mark_name].copy()
+        if badge is not None:
+            _m = self.textures[badge]
+            mark.paste(_m, (13, 50), _m)
+
+        icon_pic = icon_pic.resize(ICON_SIZE).convert('RGBA')
+        mark.paste(icon_pic, (25, 17), icon_pic)
+        return mark.resize(MARK_SIZE)
+
+    def clear(self):
+        with self._lock:
+            self._sprites.clear()
+
+
+sprite_cache = SpriteCache()
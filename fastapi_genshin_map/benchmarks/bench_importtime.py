@@ -0,0 +1,48 @@
+'''
+统计导入服务模块的耗时, 基于 python -X importtime
+
+    python benchmarks/bench_importtime.py [模块] [显示数量]
+
+默认统计 main, 输出总耗时与累计耗时最高的模块
+'''
+import sys
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parents[1]
+
+
+def importtime(module: str):
+    # 每次在新进程中导入, 排除已缓存的模块
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        head, cumulative_us, name = line.split('|')
+        self_us = head.split(':')[1]
+        times.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return times
+
+
+def main(module: str = 'main', top: int = 15, runs: int = 5):
+    totals = []
+    for _ in range(runs):
+        times = importtime(module)
+        total = next(t for t in times if t[2].strip() == module)
+        totals.append(total[0])
+    print(f'导入 {module}: 最短 {min(totals) / 1000:.1f} ms (共 {runs} 次)')
+    print(f'{"累计(ms)":>10} {"自身(ms)":>10}  模块')
+    for cumulative_us, self_us, name in sorted(times, reverse=True)[:top]:
+        print(f'{cumulative_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}')
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(args[0] if args else 'main', *map(int, args[1:]))